@@ -0,0 +1,64 @@
+import queue
+import threading
+
+# grows an RRT on a worker thread, so a window showing it stays responsive however long growing takes
+# the window asks for the tree to be grown to a time with request; after each step the worker sends
+# the nodes which changed, and any path found, through deltas for the window to draw
+# the worker holds lock while it changes the tree, and anything else reading or changing the tree must too
+class BackgroundPlanner(object):
+
+	def __init__(self, rrt):
+		self.rrt = rrt
+		self.lock = threading.Lock()
+		self.requests = queue.Queue() # times to grow the tree to, or None to finish
+		self.deltas = queue.Queue() # (time, changed nodes, path or None), one per step grown
+		self.thread = None
+
+	def __str__(self):
+		return ("BackgroundPlanner: [running: " + str(self.running) +
+			" requests: " + str(self.requests.qsize()) + " deltas: " + str(self.deltas.qsize()) + "]")
+
+	@property
+	def running(self):
+		return self.thread is not None and self.thread.is_alive()
+
+	def start(self):
+		self.thread = threading.Thread(target=self.run, name="planner", daemon=True)
+		self.thread.start()
+
+	# asks for the tree to be grown to time t, abandoning any step still growing toward an earlier request
+	def request(self, t):
+		self.requests.put(t)
+
+	# stops the worker after the step it's on, waiting up to timeout seconds for it
+	def stop(self, timeout=None):
+		self.requests.put(None)
+		if self.thread:
+			self.thread.join(timeout)
+
+	# whether the step being grown should be abandoned, since a newer request is waiting
+	def cancelled(self):
+		return not self.requests.empty()
+
+	def run(self):
+		while True:
+			t = self.requests.get()
+			# only the latest request matters, the tree is grown straight to it
+			while t is not None and not self.requests.empty():
+				t = self.requests.get()
+			if t is None:
+				return
+
+			with self.lock:
+				path = self.rrt.grow_to(t, self.cancelled)
+				changes = self.rrt.take_changes()
+			self.deltas.put((t, changes, path))
+
+	# the deltas sent since the last call, oldest first, without waiting for any more
+	def take_deltas(self):
+		deltas = []
+		while True:
+			try:
+				deltas.append(self.deltas.get_nowait())
+			except queue.Empty:
+				return deltas
@@ -0,0 +1,108 @@
+import argparse
+import collections
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from scenario import Scenario, read_binary, read_json, read_scenarios
+
+# plans one scenario, returning its result as a dict ready for JSON
+# a scenario which couldn't be read (given as the exception reading it raised) or fails to plan gives
+# {"index", "name", "error"} instead, so one bad scenario doesn't stop the rest of a batch
+def run_scenario(index, scenario, waypoints=False):
+	if isinstance(scenario, Exception):
+		return error_record(index, None, scenario)
+	try:
+		result = scenario.plan()
+	except Exception as error:
+		return error_record(index, scenario.name, error)
+	record = {
+		"index": index,
+		"name": scenario.name,
+		"found": result.found,
+		"arrival_time": result.arrival_time,
+		"t": result.t,
+		"nodes": len(result.rrt.nodes),
+		"timings": result.timings,
+	}
+	if waypoints and result.found:
+		record["waypoints"] = result.waypoints.tolist()
+	return record
+
+def error_record(index, name, error):
+	return {"index": index, "name": name, "error": type(error).__name__ + ": " + str(error)}
+
+# yields (index, scenario) for every scenario in the inputs ("-" reads JSON Lines from stdin)
+# keeping only those in this shard, given as (shard, shards)
+# with skip_errors, a scenario which can't be read comes as the exception it raised, see scenario.parse_record
+def numbered(inputs, shard=None, skip_errors=False):
+	index = 0
+	for path in inputs:
+		if path == "-":
+			if sys.stdin.buffer.peek(4)[:4] == b"TOBS":
+				scenarios = read_binary(sys.stdin.buffer, skip_errors)
+			else:
+				scenarios = read_json(sys.stdin, skip_errors)
+		else:
+			scenarios = read_scenarios(path, skip_errors)
+		for scenario in scenarios:
+			if shard is None or index % shard[1] == shard[0]:
+				yield index, scenario
+			index += 1
+
+# plans each scenario, yielding results in the order the scenarios came in
+# with workers, at most a few scenarios per worker are read ahead, so neither the scenarios nor the
+# results are ever all held in memory
+def run_batch(scenarios, workers=1, waypoints=False):
+	if workers <= 1:
+		for index, scenario in scenarios:
+			yield run_scenario(index, scenario, waypoints)
+		return
+
+	with ProcessPoolExecutor(workers) as pool:
+		in_flight = collections.deque()
+		for index, scenario in scenarios:
+			in_flight.append(pool.submit(run_scenario, index, scenario, waypoints))
+			if len(in_flight) >= 4 * workers:
+				yield in_flight.popleft().result()
+		while in_flight:
+			yield in_flight.popleft().result()
+
+def parse_shard(text):
+	shard, shards = (int(part) for part in text.split("/"))
+	if not 0 <= shard < shards:
+		raise argparse.ArgumentTypeError("shard must be i/n with 0 <= i < n")
+	return shard, shards
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(
+		description="Plans every scenario in the inputs, writing one JSON result per line.")
+	parser.add_argument("inputs", nargs="*", default=["-"],
+		help="scenario files: JSON, JSON Lines or binary (default: stdin)")
+	parser.add_argument("-o", "--output", help="write results here instead of to stdout")
+	parser.add_argument("-j", "--workers", type=int, default=1, help="plan this many scenarios at once")
+	parser.add_argument("--shard", type=parse_shard, help="only plan every n-th scenario starting at i, as i/n")
+	parser.add_argument("--waypoints", action="store_true", help="include each path's waypoints")
+	parser.add_argument("--convert", help="write the inputs to this file instead of planning; binary if it "
+		"ends in .tobs, JSON Lines otherwise")
+	args = parser.parse_args(argv)
+
+	if args.convert:
+		binary = args.convert.endswith(".tobs")
+		with open(args.convert, "wb" if binary else "w") as output:
+			for index, scenario in numbered(args.inputs, args.shard):
+				output.write(scenario.to_bytes() if binary else scenario.to_json() + "\n")
+		return 0
+
+	output = open(args.output, "w") if args.output else sys.stdout
+	try:
+		for record in run_batch(numbered(args.inputs, args.shard, True), args.workers, args.waypoints):
+			output.write(json.dumps(record) + "\n")
+			output.flush()
+	finally:
+		if args.output:
+			output.close()
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
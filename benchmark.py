@@ -0,0 +1,173 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from linalgebra import *
+import collision
+from collision import *
+from planner import plan
+from rrt import RRT, default_obstacles, random_obstacles
+
+# where the simbot starts and where it's heading in every scenario, as in the example scene
+base = (200, 180)
+goal = (300, 350)
+
+# how many branches are sampled at once while growing a tree to a given size
+batch_size = 256
+
+# grows a tree of exactly nodes nodes at a single time t, branching off randomly picked trunks
+def grow_tree(obstacles, nodes, seed, t=0):
+	rrt = RRT(obstacles=obstacles, seed=seed)
+	rrt.base = Vector(base)
+	rrt.goal = Vector(goal)
+	rrt.create_rrt()
+
+	while len(rrt.nodes) < nodes:
+		picked = rrt.rng.integers(0, len(rrt.nodes), min(batch_size, nodes - len(rrt.nodes)))
+		for trunk, loc in rrt.sample_branches([rrt.nodes[i] for i in picked]):
+			rrt.grow(trunk, loc, t)
+	return rrt
+
+# the ways of growing which keep validity up to date incrementally, each checked by check_validity
+check_settings = {
+	"plain": {},
+	"star": {"star": True},
+	"bidirectional": {"bidirectional": True},
+	"space_time": {"space_time": True},
+	"star_space_time": {"star": True, "space_time": True},
+}
+
+# grows a tree in each of check_settings' ways for steps steps of time_step, comparing the incrementally
+# updated validity with a full recompute (RRT.validity_errors) after every branch
+# returns the number of nodes found wrong for each way, which should all be 0
+def check_validity(obstacles, seed, steps=40, branches=8):
+	errors = {}
+	for name, settings in check_settings.items():
+		rrt = RRT(obstacles=obstacles, seed=seed)
+		for setting, value in settings.items():
+			setattr(rrt, setting, value)
+		rrt.base = Vector(base)
+		rrt.goal = Vector(goal)
+		rrt.create_rrt()
+
+		wrong = 0
+		for step in range(1, steps + 1):
+			t = step * rrt.time_step
+			picked = rrt.rng.integers(0, len(rrt.nodes), branches)
+			for trunk, loc in rrt.sample_branches([rrt.nodes[i] for i in picked]):
+				rrt.grow(trunk, loc, t)
+				wrong += len(rrt.validity_errors(t))
+			if rrt.bidirectional:
+				rrt.connect_trees(rrt.nodes[-branches:], t)
+				wrong += len(rrt.validity_errors(t))
+		errors[name] = wrong
+	return errors
+
+# runs one scenario, returning its measurements
+def run_scenario(name, obstacles, nodes, seed, max_time, memory=True, check=False):
+	result = {"scenario": name, "obstacles": len(obstacles), "nodes": nodes, "seed": seed}
+
+	started = time.perf_counter()
+	rrt = grow_tree(obstacles, nodes, seed)
+	elapsed = time.perf_counter() - started
+	result["grow_seconds"] = elapsed
+	result["nodes_per_sec"] = nodes / elapsed
+
+	# one exact pass over every edge of the tree, then a full validity update at a new time
+	connections = [node.parent for node in rrt.nodes[1:]]
+	edges = connection_edges(connections)
+	t = RRT.time_step
+	tested = collision.tested_pairs
+	started = time.perf_counter()
+	edges_blocked(edges, obstacles, t, None, rrt.obstacle_motion())
+	elapsed = time.perf_counter() - started
+	result["collision_pass_seconds"] = elapsed
+	result["edges_per_sec"] = len(edges) / elapsed
+	# edge vs obstacle side pairs tested exactly, after the broad phase ruled the rest out
+	result["collision_tests"] = collision.tested_pairs - tested
+	result["collision_tests_per_sec"] = result["collision_tests"] / elapsed
+
+	started = time.perf_counter()
+	rrt.validity(2 * t)
+	result["validity_seconds"] = time.perf_counter() - started
+
+	planned = plan(obstacles, base, goal, max_time, seed)
+	result["found_path"] = planned.found
+	result["time_to_first_path"] = planned.timings["first_path"]
+	result["arrival_time"] = planned.arrival_time
+	result["plan_nodes"] = len(planned.rrt.nodes)
+
+	if check:
+		result["validity_errors"] = check_validity(obstacles, seed)
+
+	if memory:
+		tracemalloc.start()
+		grow_tree(obstacles, nodes, seed)
+		result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+	return result
+
+# the example scene, then a generated scene for every obstacle count, each grown to every node count
+def scenarios(obstacle_counts, node_counts, seed):
+	for nodes in node_counts:
+		yield "default", default_obstacles(), nodes
+	for count in obstacle_counts:
+		obstacles = random_obstacles(count, seed)
+		for nodes in node_counts:
+			yield "random-" + str(count), obstacles, nodes
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmarks the planner's hot paths on seeded scenarios, printing JSON.")
+	parser.add_argument("--obstacles", type=int, nargs="+", default=[10, 50, 500],
+		help="obstacle counts of the generated scenes")
+	parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 10000, 100000],
+		help="tree sizes to grow each scene to")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--max-time", type=float, default=30.0,
+		help="time horizon, in seconds, when measuring time to first path")
+	parser.add_argument("--quick", action="store_true", help="only the smallest scenes, as a smoke test")
+	parser.add_argument("--no-memory", action="store_true", help="skip the (slower) peak memory measurement")
+	parser.add_argument("--output", help="write the JSON here instead of to stdout")
+	parser.add_argument("--check", action="store_true",
+		help="also check incrementally updated validity against a full recompute, failing if they differ")
+	args = parser.parse_args(argv)
+
+	obstacle_counts = args.obstacles
+	node_counts = args.nodes
+	if args.quick:
+		obstacle_counts = [min(obstacle_counts)]
+		node_counts = [min(node_counts)]
+
+	results = []
+	for name, obstacles, nodes in scenarios(obstacle_counts, node_counts, args.seed):
+		result = run_scenario(name, obstacles, nodes, args.seed, args.max_time, not args.no_memory, args.check)
+		results.append(result)
+		print(name, nodes, "nodes:", round(result["nodes_per_sec"]), "nodes/s", file=sys.stderr)
+
+	report = {
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"platform": platform.platform(),
+		"seed": args.seed,
+		"results": results,
+	}
+
+	text = json.dumps(report, indent=2)
+	if args.output:
+		with open(args.output, "w") as output:
+			output.write(text + "\n")
+	else:
+		print(text)
+
+	if args.check and any(any(result["validity_errors"].values()) for result in results):
+		print("incremental validity differs from a full recompute", file=sys.stderr)
+		return 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,65 @@
+from linalgebra import *
+from spatial import GridIndex
+
+# a node of a GoalTree, which leads toward the goal rather than away from the base
+class GoalNode(object):
+	__slots__ = ("loc", "len", "depth", "next", "intervals")
+
+	def __init__(self, loc, next=None, length=0):
+		self.loc = loc
+		self.len = length # the time taken to travel from this node to the goal
+		self.next = next # the node after this one on the way to the goal, None for the goal itself
+		self.depth = next.depth + 1 if next else 0
+		self.intervals = None # the times the edge to next is blocked, see RRT.route_blocked
+
+	def __getitem__(self, index):
+		return self.loc[index]
+
+	def __str__(self):
+		return "[goal tree: " + str(self.len) + " " + str(self.loc) + "]"
+
+# a tree grown backward from the goal, for an RRT to meet in the middle (as in RRT-Connect)
+# when the simbot reaches a node depends on which node of the RRT it is joined to, so nodes only know
+# how long they take to reach the goal, and edges are only checked against obstacles once a route is found
+class GoalTree(object):
+
+	def __init__(self, goal, traversal_rate, branch_len_max):
+		self.traversal_rate = traversal_rate
+		self.branch_len_max = branch_len_max
+
+		self.root = GoalNode(goal)
+		self.nodes = [self.root]
+		self.index = GridIndex()
+		self.index.add(self.root, goal[0], goal[1])
+
+	def __len__(self):
+		return len(self.nodes)
+
+	def __str__(self):
+		return "GoalTree: [" + str(len(self.nodes)) + " nodes from " + str(self.root.loc) + "]"
+
+	# grows a branch toward sample off of the node nearest to it, no longer than branch_len_max
+	def extend(self, sample):
+		trunk = self.nearest(sample)[0]
+		offset = Vector((sample[0], sample[1])).subtract(trunk.loc)
+		dist = offset.len()
+		if dist > self.branch_len_max:
+			offset = offset.scalar(self.branch_len_max / dist)
+			dist = self.branch_len_max
+
+		node = GoalNode(offset.add(trunk.loc), trunk, trunk.len + dist / self.traversal_rate)
+		self.nodes.append(node)
+		self.index.add(node, node.loc[0], node.loc[1])
+		return node
+
+	# the nodes nearest to loc, nearest first
+	def nearest(self, loc, k=1):
+		return self.index.nearest(loc[0], loc[1], k)
+
+	# the nodes from node to the goal, in the order they are traveled
+	def route(self, node):
+		nodes = []
+		while node:
+			nodes.append(node)
+			node = node.next
+		return nodes
@@ -0,0 +1,261 @@
+import bisect
+import math
+
+import numpy as np
+
+# the most orientation tests evaluated at once, bounds the memory used by the kernel
+chunk_size = 1 << 20
+
+# how many edge against obstacle side pairs have been tested exactly (after any broad phase) by
+# segments_blocked, segments_blocked_sat and edge_blocked_over_time, read by profiling.Profiler
+tested_pairs = 0
+
+# returns every side of every obstacle at time t as rows of [x1, y1, x2, y2]
+# the last vertex of each obstacle loops back to its first one
+# poses are looked up in pose_cache if one is given
+def obstacle_sides(obstacles, t, pose_cache=None):
+	sides = []
+	for obstacle in obstacles:
+		if pose_cache is not None:
+			vertices = pose_cache.vertices(obstacle, t)
+		else:
+			vertices = obstacle.absolute_array(t)
+		sides.append(np.hstack((np.roll(vertices, 1, axis=0), vertices)))
+
+	if not sides:
+		return np.zeros((0, 4))
+	return np.vstack(sides)
+
+# the radius of the smallest circle around the obstacle's center holding all of its points
+# the obstacle only ever rotates about that center, so it never leaves the circle
+def bounding_radius(obstacle):
+	return obstacle.radius
+
+# returns a row of [x velocity, y velocity, x at t = 0, y at t = 0, bounding radius] for each obstacle
+# everything the broad phase needs, worth keeping for as long as the obstacles don't change
+def obstacle_motion(obstacles):
+	motion = [(obstacle.velocity[0], obstacle.velocity[1], obstacle.t0[0], obstacle.t0[1], bounding_radius(obstacle))
+		for obstacle in obstacles]
+	return np.array(motion, dtype=float).reshape(-1, 5)
+
+# returns a row of [min x, min y, max x, max y] for each obstacle, bounding everywhere it goes
+# between times t0 and t1 (just at t0 if t1 isn't given)
+def obstacle_bounds(obstacles, t0, t1=None, motion=None):
+	if t1 is None:
+		t1 = t0
+	if motion is None:
+		motion = obstacle_motion(obstacles)
+
+	vx, vy, x, y, r = motion.T
+	# the center moves in a straight line, so its extremes are at the ends of the interval
+	x0, y0 = vx * t0 + x, vy * t0 + y
+	x1, y1 = vx * t1 + x, vy * t1 + y
+	return np.column_stack((np.minimum(x0, x1) - r, np.minimum(y0, y1) - r,
+		np.maximum(x0, x1) + r, np.maximum(y0, y1) + r))
+
+# returns a row of [min x, min y, max x, max y] for each edge
+def edge_bounds(edges):
+	edges = np.asarray(edges, dtype=float).reshape(-1, 4)
+	return np.column_stack((
+		np.minimum(edges[:, 0], edges[:, 2]), np.minimum(edges[:, 1], edges[:, 3]),
+		np.maximum(edges[:, 0], edges[:, 2]), np.maximum(edges[:, 1], edges[:, 3])))
+
+# returns an (edges, obstacles) mask which is True where the bounding boxes overlap,
+# the only pairs which could possibly intersect
+def candidate_pairs(edge_boxes, obstacle_boxes):
+	return ((edge_boxes[:, np.newaxis, 0] <= obstacle_boxes[np.newaxis, :, 2]) &
+		(edge_boxes[:, np.newaxis, 2] >= obstacle_boxes[np.newaxis, :, 0]) &
+		(edge_boxes[:, np.newaxis, 1] <= obstacle_boxes[np.newaxis, :, 3]) &
+		(edge_boxes[:, np.newaxis, 3] >= obstacle_boxes[np.newaxis, :, 1]))
+
+# returns a row of [x1, y1, x2, y2] for each connection
+def connection_edges(connections):
+	edges = [(c.start.loc[0], c.start.loc[1], c.end.loc[0], c.end.loc[1]) for c in connections]
+	return np.array(edges, dtype=float).reshape(-1, 4)
+
+# returns the orientation of each point relative to each segment, as in Connection.get_rotate
+# True --> clockwise; False --> counterclockwise
+def orientation(x1, y1, x2, y2, px, py):
+	return (y2 - y1) * (px - x2) - (x2 - x1) * (py - y2) > 0
+
+# returns a boolean mask with one entry per edge, True if the edge crosses any side
+# edges and sides are both arrays with rows of [x1, y1, x2, y2]
+# this is the same test as RRT.intersects_ob, evaluated for every pair at once
+def segments_blocked(edges, sides):
+	global tested_pairs
+	edges = np.asarray(edges, dtype=float).reshape(-1, 4)
+	sides = np.asarray(sides, dtype=float).reshape(-1, 4)
+	blocked = np.zeros(len(edges), dtype=bool)
+	if not len(edges) or not len(sides):
+		return blocked
+	tested_pairs += len(edges) * len(sides)
+
+	# edges down the rows, sides across the columns
+	sx1, sy1, sx2, sy2 = (sides[:, i][np.newaxis, :] for i in range(4))
+	step = max(1, chunk_size // len(sides))
+
+	for first in range(0, len(edges), step):
+		chunk = edges[first:first + step]
+		ex1, ey1, ex2, ey2 = (chunk[:, i][:, np.newaxis] for i in range(4))
+
+		side_1 = orientation(sx1, sy1, sx2, sy2, ex1, ey1)
+		side_2 = orientation(sx1, sy1, sx2, sy2, ex2, ey2)
+		connect_1 = orientation(ex1, ey1, ex2, ey2, sx1, sy1)
+		connect_2 = orientation(ex1, ey1, ex2, ey2, sx2, sy2)
+
+		# if both sets go different directions, then the side intersects the edge
+		crosses = (side_1 != side_2) & (connect_1 != connect_2)
+		blocked[first:first + step] = crosses.any(axis=1)
+
+	return blocked
+
+# returns a boolean mask with one entry per edge, True if the edge touches the convex polygon
+# with the given vertices and outward side normals, both (n, 2) arrays
+# by the separating axis theorem the two miss each other exactly when, along one of the polygon's
+# normals or the edge's own normal, their projections don't overlap
+# unlike segments_blocked, an edge lying wholly inside the polygon is blocked too
+def segments_blocked_sat(edges, vertices, normals):
+	global tested_pairs
+	edges = np.asarray(edges, dtype=float).reshape(-1, 4)
+	if not len(edges) or not len(vertices):
+		return np.zeros(len(edges), dtype=bool)
+	tested_pairs += len(edges) * len(vertices)
+
+	# the polygon's normals, edges down the rows and normals across the columns
+	polygon = vertices @ normals.T
+	ends_1 = edges[:, 0:2] @ normals.T
+	ends_2 = edges[:, 2:4] @ normals.T
+	separated = ((np.minimum(ends_1, ends_2) > polygon.max(axis=0)) |
+		(np.maximum(ends_1, ends_2) < polygon.min(axis=0))).any(axis=1)
+
+	# each edge's normal, along which the whole edge projects to a single value
+	edge_normals = np.stack((edges[:, 1] - edges[:, 3], edges[:, 2] - edges[:, 0]), axis=1)
+	along = vertices @ edge_normals.T
+	value = (edges[:, 0:2] * edge_normals).sum(axis=1)
+	separated |= (value > along.max(axis=0)) | (value < along.min(axis=0))
+
+	return ~separated
+
+# returns a boolean mask with one entry per edge, True if the edge crosses any obstacle at time t
+# bounding boxes are compared first, so only edges near an obstacle are tested against its sides
+# motion is the obstacles' obstacle_motion, if it has already been worked out
+# if separating_axis is True, convex obstacles are tested with segments_blocked_sat instead
+def edges_blocked(edges, obstacles, t, pose_cache=None, motion=None, separating_axis=False):
+	edges = np.asarray(edges, dtype=float).reshape(-1, 4)
+	blocked = np.zeros(len(edges), dtype=bool)
+	if not len(edges) or not len(obstacles):
+		return blocked
+
+	obstacle_boxes = obstacle_bounds(obstacles, t, motion=motion)
+	step = max(1, chunk_size // len(obstacles))
+	for first in range(0, len(edges), step):
+		chunk = edges[first:first + step]
+		chunk_blocked = blocked[first:first + step]
+
+		candidates = candidate_pairs(edge_bounds(chunk), obstacle_boxes)
+		for i in np.flatnonzero(candidates.any(axis=0)):
+			rows = np.flatnonzero(candidates[:, i] & ~chunk_blocked)
+			if not len(rows):
+				continue
+			obstacle = obstacles[i]
+			if separating_axis and obstacle.convex:
+				vertices = pose_cache.vertices(obstacle, t) if pose_cache is not None else obstacle.absolute_array(t)
+				chunk_blocked[rows] |= segments_blocked_sat(chunk[rows], vertices, obstacle.absolute_normals(t))
+			else:
+				sides = obstacle_sides((obstacle,), t, pose_cache)
+				chunk_blocked[rows] |= segments_blocked(chunk[rows], sides)
+	return blocked
+
+# returns the vertices of the obstacle at each of the given times, as a (times, vertices, 2) array
+def obstacle_vertices(obstacle, times):
+	times = np.asarray(times, dtype=float)
+	points = obstacle.array
+	angles = obstacle.velocity[2] * times + obstacle.t0[2]
+	cos = np.cos(angles)[:, np.newaxis]
+	sin = np.sin(angles)[:, np.newaxis]
+	x = points[:, 0] * cos - points[:, 1] * sin + (obstacle.velocity[0] * times + obstacle.t0[0])[:, np.newaxis]
+	y = points[:, 0] * sin + points[:, 1] * cos + (obstacle.velocity[1] * times + obstacle.t0[1])[:, np.newaxis]
+	return np.stack((x, y), axis=-1)
+
+# returns a mask with one entry per time, True if the edge crosses the obstacle at that time
+def edge_blocked_over_time(edge, obstacle, times):
+	global tested_pairs
+	ex1, ey1, ex2, ey2 = edge
+	vertices = obstacle_vertices(obstacle, times)
+	tested_pairs += vertices.shape[0] * vertices.shape[1]
+	sx1, sy1 = np.roll(vertices, 1, axis=1)[..., 0], np.roll(vertices, 1, axis=1)[..., 1]
+	sx2, sy2 = vertices[..., 0], vertices[..., 1]
+
+	side_1 = orientation(sx1, sy1, sx2, sy2, ex1, ey1)
+	side_2 = orientation(sx1, sy1, sx2, sy2, ex2, ey2)
+	connect_1 = orientation(ex1, ey1, ex2, ey2, sx1, sy1)
+	connect_2 = orientation(ex1, ey1, ex2, ey2, sx2, sy2)
+	return ((side_1 != side_2) & (connect_1 != connect_2)).any(axis=1)
+
+# returns the distance from each point to the segment
+def segment_distance(edge, x, y):
+	x1, y1, x2, y2 = edge
+	dx = x2 - x1
+	dy = y2 - y1
+	length = dx * dx + dy * dy
+	if length:
+		along = np.clip(((x - x1) * dx + (y - y1) * dy) / length, 0, 1)
+	else:
+		along = 0
+	return np.hypot(x - (x1 + along * dx), y - (y1 + along * dy))
+
+# returns the sorted, disjoint intervals of time between t0 and t1 during which the edge crosses
+# any of the obstacles, as a list of (start, end)
+# the obstacles' motion is sampled every resolution seconds (a sample is only tested exactly when
+# the obstacle's bounding circle reaches the edge), then the ends of each blocked run are found by
+# bisection and rounded outwards, so contacts shorter than resolution can be missed
+def blocked_intervals(edge, obstacles, t0, t1, resolution=.05):
+	edge = tuple(float(coord) for coord in edge)
+	times = t0 + np.arange(0, int(math.ceil((t1 - t0) / resolution)) + 1) * resolution
+	times[-1] = min(times[-1], t1)
+	blocked = np.zeros(len(times), dtype=bool)
+
+	for obstacle in obstacles:
+		centers_x = obstacle.velocity[0] * times + obstacle.t0[0]
+		centers_y = obstacle.velocity[1] * times + obstacle.t0[1]
+		near = segment_distance(edge, centers_x, centers_y) <= bounding_radius(obstacle)
+		samples = np.flatnonzero(near & ~blocked)
+		if len(samples):
+			blocked[samples] = edge_blocked_over_time(edge, obstacle, times[samples])
+
+	def blocked_at(t):
+		return any(edge_blocked_over_time(edge, obstacle, (t,))[0] for obstacle in obstacles)
+
+	# the time between a free sample and a blocked one where the edge becomes blocked
+	def boundary(free, hit):
+		while abs(hit - free) > resolution / 64.0:
+			middle = (free + hit) / 2.0
+			if blocked_at(middle):
+				hit = middle
+			else:
+				free = middle
+		return min(free, hit) if free < hit else max(free, hit)
+
+	intervals = []
+	changes = np.flatnonzero(np.diff(blocked.astype(np.int8)))
+	starts = [0] if blocked[0] else []
+	starts.extend(changes[~blocked[changes]] + 1)
+	ends = list(changes[blocked[changes]])
+	if blocked[-1]:
+		ends.append(len(times) - 1)
+
+	for start, end in zip(starts, ends):
+		start_t = boundary(times[start - 1], times[start]) if start > 0 else times[0]
+		end_t = boundary(times[end + 1], times[end]) if end < len(times) - 1 else times[-1]
+		intervals.append((float(start_t), float(end_t)))
+	return intervals
+
+# whether time t falls inside any of the sorted, disjoint intervals
+def in_intervals(intervals, t):
+	i = bisect.bisect_right(intervals, (t, math.inf)) - 1
+	return i >= 0 and intervals[i][1] >= t
+
+# whether any of the sorted, disjoint intervals overlaps the interval [t0, t1]
+def overlaps_intervals(intervals, t0, t1):
+	i = bisect.bisect_right(intervals, (t1, math.inf)) - 1
+	return i >= 0 and intervals[i][1] >= t0
@@ -1,7 +1,10 @@
 import math
 
+import numpy as np
+
 # vector[0] = x; vector[1] = y; vector[2] = theta
 class Vector(object):
+	__slots__ = ("coords",)
 
 	def __init__(self, coords):
 		self.coords = coords
@@ -22,42 +25,65 @@ class Vector(object):
 	def __len__(self):
 		return len(self.coords)
 
+	def __iter__(self):
+		return iter(self.coords)
+
 	# gives the Euclidean length of vector, called as vector.len()
 	def len(self):
-		total = 0
-		for coord in self.coords:
-			total += coord**2.0
-
-		return math.sqrt(total)
+		return math.sqrt(sum(coord * coord for coord in self.coords))
 
 	# returns this vector multiplied by a scalar
 	def scalar(self, scalar):
-		new_vector = []
-
-		for coord in self.coords:
-			new_vector.append(coord * scalar)
-
-		return Vector(tuple(new_vector))
+		return Vector(tuple(coord * scalar for coord in self.coords))
 
 	# adds this vector to other
 	def add(self, other):
-		new_vector = []
-
-		for i in range(0, len(self)):
-			new_vector.append(self[i] + other[i])
-
-		return Vector(tuple(new_vector))
+		return Vector(tuple(a + b for a, b in zip(self.coords, coords_of(other))))
 
 	# subtracts other from self
 	def subtract(self, other):
-		new_vector = []
+		return Vector(tuple(a - b for a, b in zip(self.coords, coords_of(other))))
 
-		for i in range(0, len(self)):
-			new_vector.append(self[i] - other[i])
+	# returns self + other * scalar without building the scaled vector
+	def add_scaled(self, other, scalar):
+		return Vector(tuple(a + b * scalar for a, b in zip(self.coords, coords_of(other))))
+
+	# the in place versions change this vector rather than returning a new one
+	def iadd(self, other):
+		self.coords = tuple(a + b for a, b in zip(self.coords, coords_of(other)))
+		return self
+
+	def isubtract(self, other):
+		self.coords = tuple(a - b for a, b in zip(self.coords, coords_of(other)))
+		return self
+
+	def iscalar(self, scalar):
+		self.coords = tuple(coord * scalar for coord in self.coords)
+		return self
 
-		return Vector(tuple(new_vector))
+	# the distance between this vector and other, without building their difference
+	def dist(self, other):
+		return math.sqrt(sum((a - b)**2 for a, b in zip(self.coords, coords_of(other))))
+
+# the coordinates of a Vector, or anything else indexable like one
+def coords_of(vector):
+	return vector.coords if isinstance(vector, Vector) else vector
+
+# rotates each (x, y) row of points by a (measured in radians) then moves it by offset, in one call
+# returns an (n, 2) array
+def transform_points(points, a, offset=(0, 0)):
+	points = np.asarray(points, dtype=float)
+	cos = math.cos(a)
+	sin = math.sin(a)
+	transformed = np.empty((len(points), 2))
+	transformed[:, 0] = points[:, 0] * cos - points[:, 1] * sin + offset[0]
+	transformed[:, 1] = points[:, 0] * sin + points[:, 1] * cos + offset[1]
+	return transformed
 
 class Shape(object):
+	__slots__ = ("points", "velocity", "t0", "points_array", "signed_area", "local_centroid", "radius",
+		"normals", "convex")
+
 	# Takes an tuple of vectors defining the corners of the shape relative to the center, 
 	# clockwise from UL; where the center starts; and a velocity that the shape is moving at
 	def __init__(self, points, t0, velocity):
@@ -66,7 +92,7 @@ class Shape(object):
 
 		# append a zero for rotation if needed
 		for point in points:
-			if len(point) is 2:
+			if len(point) == 2:
 				points3.append(Vector((point[0], point[1], 0)))
 			else:
 				points3.append(point)
@@ -74,6 +100,8 @@ class Shape(object):
 		self.points = tuple(points3)
 		self.velocity = velocity
 		self.t0 = t0 # position at t = 0
+		self.points_array = None # see array
+		self.measure()
 
 	def __str__(self):
 		str_list = []
@@ -81,6 +109,59 @@ class Shape(object):
 			str_list.append(str(point))
 		return ''.join(str_list)
 	
+	# works out everything about the shape's own geometry once, since its points never change:
+	# its signed area (positive if the points go counterclockwise with y up), its centroid relative to
+	# its center, the radius of the smallest circle about its center holding every point, whether it is
+	# convex, and a unit normal pointing out of each side as an (n, 2) array
+	# side i runs from point i - 1 to point i, as in collision.obstacle_sides
+	# see: https://en.wikipedia.org/wiki/Shoelace_formula and https://en.wikipedia.org/wiki/Centroid#Of_a_polygon
+	def measure(self):
+		points = self.points
+		signed_area = 0
+		c_x = 0
+		c_y = 0
+		for i in range(0, len(points)):
+			x1, y1 = points[i - 1][0], points[i - 1][1]
+			x2, y2 = points[i][0], points[i][1]
+			cross = x1*y2 - x2*y1
+			signed_area += cross
+			c_x += (x1 + x2) * cross
+			c_y += (y1 + y2) * cross
+		signed_area /= 2.0
+		self.signed_area = signed_area
+
+		if signed_area:
+			self.local_centroid = (c_x / (6.0*signed_area), c_y / (6.0*signed_area))
+		else:
+			self.local_centroid = (0.0, 0.0)
+		self.radius = max(math.sqrt(point[0]**2 + point[1]**2) for point in points) if points else 0.0
+
+		# the outside of each side is to its right going counterclockwise, to its left going clockwise
+		outward = 1 if signed_area >= 0 else -1
+		normals = []
+		turns = set()
+		for i in range(0, len(points)):
+			dx = points[i][0] - points[i - 1][0]
+			dy = points[i][1] - points[i - 1][1]
+			length = math.sqrt(dx*dx + dy*dy)
+			normals.append((outward * dy / length, -outward * dx / length) if length else (0.0, 0.0))
+
+			# a convex shape turns the same way at every corner
+			next_dx = points[(i + 1) % len(points)][0] - points[i][0]
+			next_dy = points[(i + 1) % len(points)][1] - points[i][1]
+			turn = dx*next_dy - dy*next_dx
+			if turn:
+				turns.add(turn > 0)
+		self.normals = np.array(normals, dtype=float).reshape(-1, 2)
+		self.convex = len(turns) <= 1
+
+	# the points as an (n, 2) array, for transforming them all at once
+	@property
+	def array(self):
+		if self.points_array is None:
+			self.points_array = np.array([(point[0], point[1]) for point in self.points], dtype=float)
+		return self.points_array
+
 	# returns the location of the shape at the given time t
 	# as r(t) = integral(vdt, 0, t) = vt + initial position
 	def location(self, t):
@@ -105,55 +186,40 @@ class Shape(object):
 
 		return Shape(abs_points, rotated.t0, rotated.velocity)
 
+	# the same points as absolute_pos, as an (n, 2) array built without any intermediate shapes
+	def absolute_array(self, t):
+		return transform_points(self.array, self.velocity[2]*t + self.t0[2],
+			(self.velocity[0] * t + self.t0[0], self.velocity[1] * t + self.t0[1]))
+
 	# returns the shape, rotated by a (measured in radians)
 	def rotate(self, a):
-		rot_matrix = Matrix((
-			Vector((math.cos(a), math.sin(a), 0)),
-			Vector((-math.sin(a), math.cos(a), 0)),
-			Vector((0, 0, 1))
-			))
+		# the same as multiplying by the rotation matrix, without building it
+		cos = math.cos(a)
+		sin = math.sin(a)
 
 		new_points = []
 
 		for point in self.points:
-			new_points.append(rot_matrix.mult(point))
+			new_points.append(Vector((point[0]*cos - point[1]*sin, point[0]*sin + point[1]*cos, point[2])))
 
 		# new_t0 = (self.t0[0], self.t0[1], self.t0[2] + a)
 		return Shape(tuple(new_points), self.t0, self.velocity)
 
-	# finds the centroid (center of mass) of the shape at time t
-	# see: https://en.wikipedia.org/wiki/Centroid#Of_a_polygon
+	# finds the centroid (center of mass) of the shape at time t, relative to where it started
 	def centroid(self, t):
-		# appends the first point to the end of the list, required for this
-		looped = list(self.points)
-		looped.append(self.points[0])
-
-		area = self.area()
-		c_x = 0
-		c_y = 0
-		for i in range(0, len(looped) - 1):
-			c_x += ((looped[i][0] + looped[i+1][0]) * 
-				(looped[i][0]*looped[i+1][1] - looped[i+1][0]*looped[i][1]))
-			c_y += ((looped[i][1] + looped[i+1][1]) * 
-				(looped[i][0]*looped[i+1][1] - looped[i+1][0]*looped[i][1]))
-
-		c_x *= 1.0/(6.0*area)
-		c_y *= 1.0/(6.0*area)
-		return Vector((c_x + self.velocity[0] * t, c_y + self.velocity[1] * t))
+		return Vector((self.local_centroid[0] + self.velocity[0] * t, self.local_centroid[1] + self.velocity[1] * t))
 
 	# Finds the area of the shape
 	# This differs from the signed area, as area below the x axis is still positive here
-	# see: https://en.wikipedia.org/wiki/Shoelace_formula
 	def area(self):
-		area = 0
-		j = len(self.points) - 1
-		for i in range(0, len(self.points)):
-			area += (self.points[j][0] + self.points[i][0]) * (self.points[j][1] - self.points[i][1])
-			j = i
+		return abs(self.signed_area)
 
-		return abs(area / 2)
+	# the outward normals of the sides at time t, rotated along with the shape, as an (n, 2) array
+	def absolute_normals(self, t):
+		return transform_points(self.normals, self.velocity[2]*t + self.t0[2])
 
 class Matrix(object):
+	__slots__ = ("values",)
 
 	# values should be a tuple of tuples (list of columns (which are vectors))
 	def __init__(self, values):
@@ -167,13 +233,8 @@ class Matrix(object):
 
 	# multiplies the matrix by the vector
 	def mult(self, vector):
-		result = Vector((0,) * len(vector)) # tuple of the length of the vector
-
-		for i in range(0, len(vector)):
-			# loop over the incoming vector's coordinates and the matrix's vectors
-			col = self.values[i]
-			vector_val = vector[i]
-			result_col = col.scalar(vector_val)
-			result = result.add(result_col)
-
-		return result
\ No newline at end of file
+		# each coordinate of the result sums one row of the matrix, weighted by the vector
+		columns = self.values
+		return Vector(tuple(
+			sum(columns[j][i] * vector[j] for j in range(0, len(vector)))
+			for i in range(0, len(vector))))
@@ -0,0 +1,117 @@
+import hashlib
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from collision import obstacle_vertices
+from raster import fill_polygon, segment_points
+
+# bump whenever the way grids are built changes, so old cached files aren't used
+version = 1
+
+# where grids are cached if no other directory is given
+default_cache_dir = os.path.join(tempfile.gettempdir(), "t-obstacles-occupancy")
+
+# the obstacles rasterized onto a grid of cells at every time_step up to horizon, so checking a point
+# or a segment is an array lookup rather than a polygon test
+# a cell is occupied when its center lies inside an obstacle, so obstacles thinner than a cell can be missed
+# grids are stored in a memory mapped file named by a hash of everything they depend on, so
+# later runs of the same scenario map the existing file instead of building it again
+class OccupancyGrid(object):
+
+	def __init__(self, obstacles, horizon, time_step=.1, resolution=2.0, width=400, height=400, cache_dir=None):
+		self.horizon = horizon
+		self.time_step = time_step
+		self.resolution = resolution # the width of a cell
+		self.width = width
+		self.height = height
+		self.columns = int(math.ceil(width / resolution))
+		self.rows = int(math.ceil(height / resolution))
+		self.slices = int(round(horizon / time_step)) + 1
+		self.shape = (self.slices, self.rows, self.columns)
+
+		self.key = scenario_key(obstacles, horizon, time_step, resolution, width, height)
+		cache_dir = cache_dir or default_cache_dir
+		self.path = os.path.join(cache_dir, self.key + ".occupancy")
+
+		self.built = False # whether this grid was built rather than loaded
+		if not os.path.exists(self.path):
+			os.makedirs(cache_dir, exist_ok=True)
+			self.build(obstacles)
+			self.built = True
+		self.grid = np.memmap(self.path, dtype=np.uint8, mode="r", shape=self.shape)
+
+	def __str__(self):
+		return ("OccupancyGrid: [" + str(self.slices) + " x " + str(self.rows) + " x " + str(self.columns) +
+			" at " + self.path + "]")
+
+	# rasterizes every obstacle at every time into a new file, moved into place once it's complete
+	def build(self, obstacles):
+		partial = self.path + "." + str(os.getpid()) + ".partial"
+		grid = np.memmap(partial, dtype=np.uint8, mode="w+", shape=self.shape)
+
+		times = np.arange(self.slices) * self.time_step
+		centers_x = (np.arange(self.columns) + .5) * self.resolution
+		centers_y = (np.arange(self.rows) + .5) * self.resolution
+		for obstacle in obstacles:
+			all_vertices = obstacle_vertices(obstacle, times)
+			for i in range(0, self.slices):
+				fill_polygon(grid[i], all_vertices[i], 1, centers_x, centers_y, self.resolution)
+
+		grid.flush()
+		del grid
+		os.replace(partial, self.path)
+
+	# the slice nearest to time t, or None if t is past the horizon
+	def slice_index(self, t):
+		index = int(round(t / self.time_step))
+		return index if 0 <= index < self.slices else None
+
+	def covers(self, t):
+		return self.slice_index(t) is not None
+
+	# whether each point (x, y) is inside an obstacle at time t
+	# raises ValueError if t isn't covered, see covers
+	def points_blocked(self, x, y, t):
+		index = self.slice_index(t)
+		if index is None:
+			raise ValueError("time " + str(t) + " is outside the grid, which covers 0 to " + str(self.horizon))
+
+		x = np.asarray(x, dtype=float)
+		y = np.asarray(y, dtype=float)
+		column = np.floor(x / self.resolution).astype(np.int64)
+		row = np.floor(y / self.resolution).astype(np.int64)
+		inside = (column >= 0) & (column < self.columns) & (row >= 0) & (row < self.rows)
+
+		blocked = np.zeros(x.shape, dtype=bool)
+		blocked[inside] = self.grid[index, row[inside], column[inside]] != 0
+		return blocked
+
+	def point_blocked(self, x, y, t):
+		return bool(self.points_blocked(np.array([x]), np.array([y]), t)[0])
+
+	# returns a mask with one entry per edge (rows of [x1, y1, x2, y2]), True if it passes through an
+	# occupied cell at time t; each edge is checked every half cell along its length
+	# raises ValueError if t isn't covered, see covers
+	def segments_blocked(self, edges, t):
+		edges = np.asarray(edges, dtype=float).reshape(-1, 4)
+		blocked = np.zeros(len(edges), dtype=bool)
+		if not len(edges):
+			return blocked
+
+		owner, x, y = segment_points(edges, self.resolution / 2)
+		np.logical_or.at(blocked, owner, self.points_blocked(x, y, t))
+		return blocked
+
+# a hash of the obstacles' shapes and motion and the grid's settings, naming its cache file
+def scenario_key(obstacles, horizon, time_step, resolution, width, height):
+	digest = hashlib.sha1()
+	digest.update(np.array([version, horizon, time_step, resolution, width, height], dtype=float).tobytes())
+	for obstacle in obstacles:
+		digest.update(np.array([len(obstacle.points)], dtype=float).tobytes())
+		digest.update(np.asarray(obstacle.array, dtype=float).tobytes())
+		digest.update(np.array([obstacle.t0[0], obstacle.t0[1], obstacle.t0[2],
+			obstacle.velocity[0], obstacle.velocity[1], obstacle.velocity[2]], dtype=float).tobytes())
+	return digest.hexdigest()
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from planner import plan
+from rrt import RRT
+
+# what one worker sends back about its run, small enough to pickle cheaply
+class SeedResult(object):
+
+	def __init__(self, seed, found, arrival_time, waypoints, timings, nodes):
+		self.seed = seed
+		self.found = found
+		self.arrival_time = arrival_time
+		self.waypoints = waypoints # rows of [x, y, arrival time], or None
+		self.timings = timings
+		self.nodes = nodes
+
+	def __str__(self):
+		return ("SeedResult: [seed: " + str(self.seed) + " found: " + str(self.found) +
+			" arrival: " + str(self.arrival_time) + " nodes: " + str(self.nodes) + "]")
+
+# the outcome of planning with several seeds at once
+class ParallelResult(object):
+
+	def __init__(self, best, results, elapsed):
+		self.best = best # the SeedResult reaching the goal first, or None
+		self.results = results # every SeedResult that finished, in the order they finished
+		self.elapsed = elapsed # wall clock seconds
+
+	def __str__(self):
+		return ("ParallelResult: [best: " + str(self.best) + " finished: " + str(len(self.results)) +
+			" elapsed: " + str(self.elapsed) + "]")
+
+	@property
+	def found(self):
+		return self.best is not None
+
+# the scenario and stop signal, sent to each worker once when it starts
+worker_scenario = None
+worker_stop = None
+
+def init_worker(scenario, stop):
+	global worker_scenario, worker_stop
+	worker_scenario = scenario
+	worker_stop = stop
+
+# plans the worker's scenario with one seed, giving up once stopped or past deadline (from time.time())
+def plan_seed(seed, deadline):
+	obstacles, start, goal, max_time = worker_scenario
+
+	def should_stop():
+		return worker_stop.is_set() or (deadline is not None and time.time() > deadline)
+
+	result = plan(obstacles, start, goal, max_time, seed, should_stop=should_stop)
+	return SeedResult(seed, result.found, result.arrival_time, result.waypoints, result.timings,
+		len(result.rrt.nodes))
+
+# plans from start to goal with each seed (or seeds 0 .. seeds - 1 if a number is given) in a pool of
+# worker processes, since how quickly a randomized tree reaches the goal varies a lot between runs
+# if first is True, the first path found is returned and every other run is cancelled; otherwise every
+# run finishes and the path arriving soonest is returned
+# budget, in seconds of wall clock time, caps the whole call
+def plan_parallel(obstacles, start, goal, seeds=8, workers=None, max_time=RRT.forward, budget=None, first=True):
+	started = time.time()
+	if isinstance(seeds, int):
+		seeds = range(0, seeds)
+	seeds = list(seeds)
+	workers = workers or min(len(seeds), os.cpu_count() or 1)
+	deadline = started + budget if budget is not None else None
+
+	stop = multiprocessing.Event()
+	scenario = (obstacles, tuple(start), tuple(goal), max_time)
+	results = []
+	best = None
+
+	pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(scenario, stop))
+	try:
+		pending = set(pool.submit(plan_seed, seed, deadline) for seed in seeds)
+
+		while pending:
+			timeout = max(0, deadline - time.time()) if deadline is not None else None
+			done, pending = wait(pending, timeout, FIRST_COMPLETED)
+			if not done: # out of time
+				break
+
+			for future in done:
+				result = future.result()
+				results.append(result)
+				if result.found and (best is None or result.arrival_time < best.arrival_time):
+					best = result
+
+			if first and best is not None:
+				break
+	finally:
+		# the runs still going wind down on their own, the call doesn't wait for them
+		stop.set()
+		pool.shutdown(wait=False, cancel_futures=True)
+
+	return ParallelResult(best, results, time.time() - started)
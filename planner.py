@@ -0,0 +1,103 @@
+import time
+
+from linalgebra import *
+from rrt import RRT
+
+# the outcome of one headless planning run
+class PlanResult(object):
+
+	def __init__(self, rrt, path, t, timings):
+		self.rrt = rrt # the grown tree
+		self.path = path # connections from the node nearest the goal back to the base, or None
+		self.t = t # the time the tree had been grown to when planning stopped
+		self.timings = timings # wall clock seconds spent in each phase
+
+	def __str__(self):
+		return ("PlanResult: [found: " + str(self.found) + " arrival: " + str(self.arrival_time) +
+			" nodes: " + str(len(self.rrt.data)) + "]")
+
+	@property
+	def found(self):
+		return self.path is not None
+
+	# the time at which the robot reaches the last node of the path
+	@property
+	def arrival_time(self):
+		if not self.path:
+			return None
+		last = self.path[0].end
+		return last.t + last.len
+
+	# the nodes of the path, ordered from the base to the node nearest the goal
+	@property
+	def nodes(self):
+		if not self.path:
+			return None
+		nodes = [connection.end for connection in reversed(self.path)]
+		nodes.insert(0, self.rrt.first_node)
+		return nodes
+
+	# the path as rows of [x, y, arrival time], from the base to the node nearest the goal
+	@property
+	def waypoints(self):
+		if not self.path:
+			return None
+		return self.rrt.waypoints(self.path[0].end)
+
+# grows an RRT from start towards goal through the obstacles without any GUI,
+# advancing time by time_step until a path is found or max_time is reached
+# should_stop is an optional callable checked between steps, and between the branches of a step, to abandon
+# the run early
+# profiler, a profiling.Profiler, is attached to the RRT for the run if given
+# settings maps names of RRT's tuning constants (traversal_rate, success_radius...) to values for this run
+# improve, in seconds, keeps growing the tree RRT* style after a path is found, for a path arriving sooner
+def plan(obstacles, start, goal, max_time=RRT.forward, seed=None, time_step=RRT.time_step,
+		should_stop=None, profiler=None, settings=None, improve=None):
+	started = time.perf_counter()
+
+	rrt = RRT(obstacles=obstacles, seed=seed)
+	for name, value in (settings or {}).items():
+		setattr(rrt, name, value)
+	if profiler:
+		profiler.attach(rrt)
+	rrt.base = Vector((start[0], start[1]))
+	rrt.goal = Vector((goal[0], goal[1]))
+
+	path = rrt.create_rrt()
+	return search(rrt, path, 0, max_time, started, time_step, should_stop, improve)
+
+# moves the goal of an earlier result and keeps growing its tree, rather than starting again
+# growing carries on from where the earlier run stopped, for up to max_time more
+# max_nodes caps the nodes kept, see RRT.retarget
+def replan(result, goal, max_time=RRT.forward, time_step=RRT.time_step, should_stop=None, improve=None,
+		max_nodes=None):
+	started = time.perf_counter()
+	path = result.rrt.retarget(goal, result.t, max_nodes)
+	return search(result.rrt, path, result.t, result.t + max_time, started, time_step, should_stop, improve)
+
+# grows rrt from time t until it has a path or max_time is reached, timing everything since started
+def search(rrt, path, t, max_time, started, time_step, should_stop, improve):
+	grown = time.perf_counter()
+	first_path = grown - started if path else None
+
+	while path is None and t < max_time:
+		if should_stop and should_stop():
+			break
+		t = round(t + time_step, 10) # avoid drifting away from multiples of time_step
+		path = rrt.update(t, should_stop)
+		if path:
+			first_path = time.perf_counter() - started
+
+	searched = time.perf_counter()
+	if path and improve:
+		path = rrt.improve(t, improve)
+
+	finished = time.perf_counter()
+	timings = {
+		"setup": grown - started,
+		"grow": searched - grown,
+		"improve": finished - searched,
+		"total": finished - started,
+		"first_path": first_path,
+	}
+	return PlanResult(rrt, path, t, timings)
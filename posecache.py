@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# remembers where each obstacle's vertices are at the times it has been asked about,
+# so the planner and the renderer don't rebuild the same rotated shapes over and over
+# the least recently used poses are dropped once more than size are stored
+class PoseCache(object):
+
+	def __init__(self, size=4096):
+		self.size = size
+		self.poses = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+
+	def __str__(self):
+		return ("PoseCache: [" + str(len(self.poses)) + "/" + str(self.size) +
+			" hits: " + str(self.hits) + " misses: " + str(self.misses) + "]")
+
+	def __len__(self):
+		return len(self.poses)
+
+	# returns the vertices of obstacle relative to the canvas at time t, as an (n, 2) array
+	# the array is shared between callers, so it is read-only
+	def vertices(self, obstacle, t):
+		key = (obstacle, t)
+		vertices = self.poses.get(key)
+
+		if vertices is not None:
+			self.hits += 1
+			self.poses.move_to_end(key)
+			return vertices
+
+		self.misses += 1
+		vertices = obstacle.absolute_array(t)
+		vertices.setflags(write=False)
+
+		self.poses[key] = vertices
+		if len(self.poses) > self.size:
+			self.poses.popitem(last=False)
+
+		return vertices
+
+	# forgets every pose, needed if an obstacle's motion changes
+	def clear(self):
+		self.poses.clear()
+
+	def stats(self):
+		return {"size": len(self.poses), "capacity": self.size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,117 @@
+import json
+import time
+
+import collision
+
+# counts and times the planner's phases while attached to an RRT
+# attaching wraps the RRT's own methods, so an RRT without a profiler runs exactly the code it always did
+class Profiler(object):
+
+	# the RRT methods which are timed
+	phases = ("update", "add_branches", "add_branch", "sample_branches", "grow", "validity",
+		"branch_validity", "blocked_mask", "blocked_during", "update_lengths", "goal_path", "find_goal_path",
+		"choose_parent", "rewire", "reparent", "improve", "connect_trees", "route_blocked",
+		"store_validity", "restore_validity")
+
+	def __init__(self, timeline=True, max_events=1000000):
+		self.calls = dict((phase, 0) for phase in Profiler.phases)
+		self.seconds = dict((phase, 0.0) for phase in Profiler.phases)
+		self.counters = {"intersection_tests": 0, "paths_found": 0}
+		self.tree_size = 0
+
+		self.timeline = timeline # whether each call is kept for the trace
+		self.max_events = max_events
+		self.events = []
+		self.started = time.perf_counter()
+		self.attached = []
+		self.tested_pairs = collision.tested_pairs # the count last added to intersection_tests
+		# the soonest arrival of each attached RRT's paths since it last had none, see count
+		self.best_arrivals = {}
+
+	def __str__(self):
+		str_list = ["Profiler: ["]
+		for phase in Profiler.phases:
+			if self.calls[phase]:
+				str_list.append(phase + ": " + str(self.calls[phase]) + " calls " +
+					str(round(self.seconds[phase], 6)) + "s ")
+		str_list.append("tree: " + str(self.tree_size) + "]")
+		return ''.join(str_list)
+
+	def attach(self, rrt):
+		for phase in Profiler.phases:
+			setattr(rrt, phase, self.wrap(rrt, phase, getattr(rrt, phase)))
+		self.attached.append(rrt)
+		self.tested_pairs = collision.tested_pairs
+		self.best_arrivals[rrt] = None
+		return rrt
+
+	# puts back the RRT's own methods
+	def detach(self, rrt):
+		for phase in Profiler.phases:
+			if phase in vars(rrt):
+				delattr(rrt, phase)
+		self.attached.remove(rrt)
+		del self.best_arrivals[rrt]
+
+	def wrap(self, rrt, phase, method):
+		def timed(*args, **kwargs):
+			start = time.perf_counter()
+			try:
+				result = method(*args, **kwargs)
+			finally:
+				end = time.perf_counter()
+				self.calls[phase] += 1
+				self.seconds[phase] += end - start
+				if self.timeline and len(self.events) < self.max_events:
+					self.events.append((phase, start, end))
+
+			self.count(rrt, phase, args, result)
+			return result
+		return timed
+
+	# updates the counters from a call that just finished
+	def count(self, rrt, phase, args, result):
+		# the edge against side pairs collision actually tested since the last call finished, so
+		# pairs the broad phase ruled out, or answered by an occupancy grid, aren't counted
+		self.counters["intersection_tests"] += collision.tested_pairs - self.tested_pairs
+		self.tested_pairs = collision.tested_pairs
+		# paths are looked for after every branch, so only one which is new, or arrives sooner
+		# than any since the tree last had no path, counts as found
+		if phase == "goal_path" and result is None:
+			self.best_arrivals[rrt] = None
+		elif phase == "find_goal_path" and result is not None:
+			arrival = result[0].end.t + result[0].end.len if result else 0
+			best = self.best_arrivals.get(rrt)
+			if best is None or arrival < best:
+				self.counters["paths_found"] += 1
+				self.best_arrivals[rrt] = arrival
+		self.tree_size = len(rrt.nodes)
+
+	def stats(self):
+		phases = {}
+		for phase in Profiler.phases:
+			calls = self.calls[phase]
+			phases[phase] = {
+				"calls": calls,
+				"seconds": self.seconds[phase],
+				"mean_seconds": self.seconds[phase] / calls if calls else 0.0,
+			}
+		stats = {"phases": phases, "tree_size": self.tree_size}
+		stats.update(self.counters)
+		return stats
+
+	# the timeline in the Chrome trace event format, for chrome://tracing or Perfetto
+	def chrome_trace(self):
+		events = []
+		for phase, start, end in self.events:
+			events.append({"name": phase, "ph": "X", "pid": 1, "tid": 1,
+				"ts": (start - self.started) * 1e6, "dur": (end - start) * 1e6})
+		return {"traceEvents": events, "otherData": self.stats()}
+
+	def save_trace(self, path):
+		with open(path, "w") as trace:
+			json.dump(self.chrome_trace(), trace)
+
+	def save_stats(self, path):
+		with open(path, "w") as stats:
+			json.dump(self.stats(), stats, indent=2)
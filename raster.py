@@ -0,0 +1,42 @@
+import math
+
+import numpy as np
+
+# sets the cells (or pixels) of a grid whose centers lie inside the polygon with the given (n, 2)
+# vertices to value, using the even-odd rule on the cells it could cover
+# grid's first two axes are rows and columns, centers_x and centers_y the centers of its columns and rows,
+# and cell_size the width of a cell
+def fill_polygon(grid, vertices, value, centers_x, centers_y, cell_size=1.0):
+	rows, columns = grid.shape[:2]
+	low_x = max(0, int(math.floor(vertices[:, 0].min() / cell_size)))
+	high_x = min(columns, int(math.ceil(vertices[:, 0].max() / cell_size)) + 1)
+	low_y = max(0, int(math.floor(vertices[:, 1].min() / cell_size)))
+	high_y = min(rows, int(math.ceil(vertices[:, 1].max() / cell_size)) + 1)
+	if low_x >= high_x or low_y >= high_y:
+		return
+
+	x = centers_x[np.newaxis, low_x:high_x]
+	y = centers_y[low_y:high_y, np.newaxis]
+	inside = np.zeros((high_y - low_y, high_x - low_x), dtype=bool)
+	x1, y1 = np.roll(vertices, 1, axis=0).T
+	x2, y2 = vertices.T
+	for i in range(0, len(vertices)):
+		if y1[i] == y2[i]:
+			continue
+		# flip every cell to the left of where this side crosses the cell's row
+		crosses = (y1[i] > y) != (y2[i] > y)
+		cross_x = x1[i] + (y - y1[i]) * (x2[i] - x1[i]) / (y2[i] - y1[i])
+		inside ^= crosses & (x < cross_x)
+	grid[low_y:high_y, low_x:high_x][inside] = value
+
+# points along every segment (rows of [x1, y1, x2, y2]), each end included and no more than spacing apart
+# returns (owner, x, y), where owner is the index of the segment each point lies on
+def segment_points(segments, spacing=1.0):
+	lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+	counts = np.ceil(lengths / spacing).astype(np.int64) + 1
+	owner = np.repeat(np.arange(len(segments)), counts)
+	starts = np.cumsum(counts) - counts
+	along = (np.arange(counts.sum()) - starts[owner]) / np.maximum(counts[owner] - 1, 1)
+	x = segments[owner, 0] + (segments[owner, 2] - segments[owner, 0]) * along
+	y = segments[owner, 1] + (segments[owner, 3] - segments[owner, 1]) * along
+	return owner, x, y
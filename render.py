@@ -0,0 +1,220 @@
+import math
+import struct
+import zlib
+
+import numpy as np
+
+from raster import fill_polygon, segment_points
+
+# the simulator's colors, as RGB
+colors = {
+	"background": (255, 255, 255),
+	"obstacle": (173, 216, 230), # light blue
+	"centroid": (70, 130, 180), # steel blue
+	"valid": (154, 255, 154), # PaleGreen1
+	"invalid": (250, 128, 114), # salmon
+	"path": (72, 118, 255), # RoyalBlue1
+	"base": (0, 255, 0), # green
+	"goal": (30, 144, 255), # dodger blue
+}
+
+# draws frames like the simulator's canvas into a NumPy image, with no display needed
+# the same buffers are drawn into for every frame, so copy a frame to keep it
+class FrameRenderer(object):
+
+	line_width = 4
+	node_size = 7
+
+	def __init__(self, width=400, height=400):
+		self.width = width
+		self.height = height
+		self.frame = np.empty((height, width, 3), dtype=np.uint8)
+		# the center of every pixel, for filling polygons
+		self.xs = np.arange(width) + .5
+		self.ys = np.arange(height) + .5
+		self.line_stamp = disk(self.line_width / 2.0)
+		self.node_stamp = disk(self.node_size)
+		# masks reused by stamp, with room around the frame for the largest stamp
+		margin = 2 * max(self.node_size, self.line_width)
+		self.points = np.zeros((height + 2 * margin, width + 2 * margin), dtype=bool)
+		self.covered = np.zeros((height, width), dtype=bool)
+		self.tree = None # arrays describing the tree being drawn, see load_tree
+
+	def clear(self):
+		self.frame[:] = colors["background"]
+
+	# colors the shape given by stamp (offsets from its center) around each of the points
+	# many points are marked on a mask which is then grown by the stamp, so the cost doesn't
+	# depend on how many points there are; a few are just stamped one by one
+	def stamp(self, x, y, stamp, color):
+		x = np.rint(np.asarray(x, dtype=float)).astype(np.int64)
+		y = np.rint(np.asarray(y, dtype=float)).astype(np.int64)
+		if not len(x):
+			return
+
+		if len(x) * len(stamp[0]) < self.covered.size:
+			x = (x[:, np.newaxis] + stamp[0]).ravel()
+			y = (y[:, np.newaxis] + stamp[1]).ravel()
+			inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+			self.frame[y[inside], x[inside]] = color
+			return
+
+		reach = max(np.abs(stamp[0]).max(), np.abs(stamp[1]).max())
+		# points just off the frame can still reach into it
+		inside = (x >= -reach) & (x < self.width + reach) & (y >= -reach) & (y < self.height + reach)
+		self.points[:] = False
+		self.points[y[inside] + reach, x[inside] + reach] = True
+
+		self.covered[:] = False
+		for dx, dy in zip(stamp[0], stamp[1]):
+			self.covered |= self.points[reach - dy:reach - dy + self.height, reach - dx:reach - dx + self.width]
+		self.frame[self.covered] = color
+
+	# draws every segment (rows of [x1, y1, x2, y2]) at once, line_width wide
+	def draw_lines(self, segments, color):
+		segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+		if not len(segments):
+			return
+		# a point every pixel along each segment
+		owner, x, y = segment_points(segments)
+		self.stamp(x, y, self.line_stamp, color)
+
+	def draw_dots(self, x, y, color, size=None):
+		stamp = self.node_stamp if size is None else disk(size)
+		self.stamp(np.atleast_1d(x), np.atleast_1d(y), stamp, color)
+
+	# fills the polygon with the given (n, 2) vertices, using the even-odd rule on pixel centers
+	def fill_polygon(self, vertices, color):
+		fill_polygon(self.frame, vertices, color, self.xs, self.ys)
+
+	# takes the positions and timings of every node of rrt as arrays, so each frame only reads validity
+	# the nodes are copied, since rrt keeps appending to its own list as it grows
+	def load_tree(self, rrt):
+		nodes = list(rrt.nodes)
+		x = np.array([node.loc[0] for node in nodes], dtype=float)
+		y = np.array([node.loc[1] for node in nodes], dtype=float)
+		arrival = np.array([node.t + node.len for node in nodes], dtype=float)
+		position = dict((node, i) for i, node in enumerate(nodes))
+		parent = np.array([position[node.parent.start] if node.parent else -1 for node in nodes], dtype=np.int64)
+		self.tree = (rrt, nodes, x, y, arrival, parent, position, rrt.nodes)
+
+	# draws rrt and its obstacles at time t, highlighting path (a list of connections) if given
+	# returns the frame
+	def render(self, rrt, t, path=None):
+		# reloaded once rrt grows, or replaces its list of nodes when pruning
+		if (self.tree is None or self.tree[0] is not rrt or self.tree[7] is not rrt.nodes or
+				len(self.tree[1]) != len(rrt.nodes)):
+			self.load_tree(rrt)
+		rrt, nodes, x, y, arrival, parent, position, source = self.tree
+
+		self.clear()
+
+		shown = arrival <= t
+		valid = np.array([node.valid for node in nodes], dtype=bool)
+		on_path = np.zeros(len(nodes), dtype=bool)
+		if path:
+			on_path[[position[connection.end] for connection in path]] = True
+
+		has_edge = shown & (parent >= 0)
+		for mask, color in ((has_edge & valid & ~on_path, "valid"), (has_edge & ~valid & ~on_path, "invalid"),
+				(has_edge & on_path, "path")):
+			ends = np.flatnonzero(mask)
+			self.draw_lines(np.column_stack((x[parent[ends]], y[parent[ends]], x[ends], y[ends])), colors[color])
+
+		for obstacle in rrt.obstacles:
+			self.fill_polygon(rrt.pose_cache.vertices(obstacle, t), colors["obstacle"])
+			centroid = obstacle.centroid(t).add(obstacle.t0)
+			self.draw_dots(centroid[0], centroid[1], colors["centroid"], 3)
+
+		for mask, color in ((shown & valid & ~on_path, "valid"), (shown & ~valid & ~on_path, "invalid"),
+				(shown & on_path, "path")):
+			self.draw_dots(x[mask], y[mask], colors[color])
+
+		self.draw_dots(rrt.base[0], rrt.base[1], colors["base"])
+		self.draw_dots(rrt.goal[0], rrt.goal[1], colors["goal"])
+		return self.frame
+
+	# renders rrt at each of times, writing each frame to frame_pattern % index (a PNG sequence),
+	# an animated PNG at animation, or both
+	# if revalidate is True, validity is updated at each time first, which changes the RRT's state
+	def export_sweep(self, rrt, times, frame_pattern=None, animation=None, fps=10, path=None, revalidate=True):
+		times = list(times)
+		movie = ApngWriter(animation, self.width, self.height, len(times), fps) if animation else None
+		try:
+			for i, t in enumerate(times):
+				if revalidate:
+					rrt.validity(t)
+				frame = self.render(rrt, t, path)
+				if frame_pattern:
+					write_png(frame_pattern % i, frame)
+				if movie:
+					movie.add(frame)
+		finally:
+			if movie:
+				movie.close()
+
+# the offsets of every pixel within radius of a center, as (x offsets, y offsets)
+disks = {}
+def disk(radius):
+	if radius not in disks:
+		disks[radius] = make_disk(radius)
+	return disks[radius]
+
+def make_disk(radius):
+	reach = int(math.ceil(radius))
+	y, x = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+	inside = x * x + y * y <= radius * radius
+	return (x[inside], y[inside])
+
+def png_chunk(kind, data):
+	return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+def png_header(width, height):
+	return b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+# the frame as compressed PNG scanlines, each with no filter
+def png_data(frame, level=6):
+	height = frame.shape[0]
+	rows = np.zeros((height, 1 + frame.shape[1] * 3), dtype=np.uint8)
+	rows[:, 1:] = frame.reshape(height, -1)
+	return zlib.compress(rows.tobytes(), level)
+
+# writes an (height, width, 3) RGB frame as a PNG
+def write_png(path, frame, level=6):
+	with open(path, "wb") as png:
+		png.write(png_header(frame.shape[1], frame.shape[0]))
+		png.write(png_chunk(b"IDAT", png_data(frame, level)))
+		png.write(png_chunk(b"IEND", b""))
+
+# writes frames one at a time into an animated PNG, so the frames never all need to be in memory
+class ApngWriter(object):
+
+	def __init__(self, path, width, height, frame_count, fps=10, level=6):
+		self.file = open(path, "wb")
+		self.width = width
+		self.height = height
+		self.fps = fps
+		self.level = level
+		self.sequence = 0
+		self.frames = 0
+
+		self.file.write(png_header(width, height))
+		self.file.write(png_chunk(b"acTL", struct.pack(">II", frame_count, 0))) # loop forever
+
+	def add(self, frame):
+		self.file.write(png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, self.width, self.height,
+			0, 0, 1, self.fps, 0, 0)))
+		self.sequence += 1
+
+		data = png_data(frame, self.level)
+		if not self.frames: # the first frame doubles as the still image
+			self.file.write(png_chunk(b"IDAT", data))
+		else:
+			self.file.write(png_chunk(b"fdAT", struct.pack(">I", self.sequence) + data))
+			self.sequence += 1
+		self.frames += 1
+
+	def close(self):
+		if not self.file.closed:
+			self.file.write(png_chunk(b"IEND", b""))
+			self.file.close()
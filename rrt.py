@@ -1,11 +1,15 @@
-import tkinter as tk
-
-import random
+import math
 import numpy as np
 import sys
+import time
 
 from linalgebra import *
-from simulator import *
+from bidirectional import GoalTree
+from collision import *
+from posecache import PoseCache
+from snapshots import ValiditySnapshots
+from spatial import GridIndex
+from treestore import TreeStore
 
 class RRT(object):
 
@@ -19,6 +23,10 @@ class RRT(object):
 	# the smaller, the fewer branches are created
 	branch_weight = 10
 
+	# after growing to time t, branch_weight becomes branch_weight_base + t, so branches keep being
+	# created as the tree grows; None keeps branch_weight as it is
+	branch_weight_base = 5
+
 	# update in seconds
 	time_step = .5
 
@@ -28,10 +36,60 @@ class RRT(object):
 	# the distance between a new node and the goal to decide we've met the goal
 	success_radius = 50.0
 
+	# new branches must end inside these bounds, the size of the canvas
+	width = 400
+	height = 400
+
+	# how many times a branch which leaves the bounds is turned by pi/10 and tried again before giving up
+	max_turns = 100
+
+	# if True, grow like RRT*: each new node is joined to whichever nearby node reaches it soonest,
+	# and nearby nodes are moved onto the new node when that gets them there sooner
+	star = False
+
+	# how many of the nearest nodes RRT* considers as parents, or moves onto a new node
+	star_neighbours = 10
+
+	# if True, a second tree is grown backward from the goal and each step tries to join the two
+	bidirectional = False
+
+	# how many of the nearest nodes of the other tree each new node tries to join
+	connect_neighbours = 3
+
+	# the most nodes kept when the goal moves, see retarget; None keeps them all
+	max_nodes = None
+
+	# samples closer than this, in pixels, to the node they'd grow from are skipped by extend
+	min_branch_len = .5
+
+	# while improving a path, the chance of sampling the goal itself rather than a random point
+	goal_bias = .1
+
 	# how many seconds to display as a forwards choice on the slider
 	forward = 5
 
-	def __init__(self, root):
+	# how many obstacle poses are remembered, see PoseCache
+	pose_cache_size = 4096
+
+	# the most memory, in bytes, used remembering the validity of the tree at times already checked
+	snapshot_bytes = 16 * 1024 * 1024
+
+	# if True, a connection is only blocked when an obstacle crosses it while the simbot is on it,
+	# rather than at the time on the slider
+	space_time = False
+
+	# if True, connections are tested against convex obstacles with the separating axis test,
+	# which also blocks connections lying wholly inside an obstacle, see collision.segments_blocked_sat
+	separating_axis = False
+
+	# how far ahead, in seconds, the times each connection is blocked are worked out
+	horizon = 60.0
+
+	# obstacles are sampled this often, in seconds, when finding the times a connection is blocked
+	interval_resolution = .05
+
+	# root is only needed when a Simulator is attached; the planner itself runs headless
+	def __init__(self, root=None, obstacles=(), seed=None):
 		self.size = 7
 		self.speed = 20
 		self.base = Vector((200, 180))
@@ -40,17 +98,37 @@ class RRT(object):
 
 		self.sim = None
 		self.root = root
+		self.obstacles = obstacles
+		self.motion = None # see obstacle_motion
+		# an optional occupancy.OccupancyGrid of the obstacles, used instead of exact tests at the times it covers
+		self.occupancy = None
+		# obstacle vertices by time, shared with the simulator
+		self.pose_cache = PoseCache(self.pose_cache_size)
+		self.snapshots = ValiditySnapshots(self.snapshot_bytes) # see restore_validity
+
+		# every random number the planner draws comes from here, so a seed makes a run repeatable
+		self.rng = np.random.default_rng(seed)
 
 		self.rrt_index = 0
 
 		self.data = {}
 		self.connects = {}
 		self.name_to_node = {} # converts a name to a node
+		self.nodes = [] # every node, in the order they were added
+		# nodes added, or whose validity or timing changed, since take_changes was last called
+		# None until something asks for changes, so a headless run doesn't keep track
+		self.changed = None
+		self.index = GridIndex() # finds nodes by location
 
 		self.found_goal = False
 
 		self.top_time = 0
 
+		# the time validity was last checked at, None once the obstacles change
+		self.valid_time = None
+
+		self.goal_tree = None # grown backward from the goal in bidirectional mode, see connect_trees
+
 		# probability of creating a new branch off of an existing one, checked each loop cycle
 		self.branch_creation = self.update_branch_creation()
 
@@ -70,24 +148,37 @@ class RRT(object):
 		# need a second node to be able to run validity
 		first_node = self.add_node(self.base, [], 0)
 		self.first_node = first_node
-		self.add_branch(0, 0)
-
-	def update(self, t):
-		base = self.name_to_node.get(0)
+		return self.add_branch(0, 0)
 
-		visited = None
-
-		if self.sim and base:
-			if t > self.top_time:
-				self.top_time = t
-				visited = self.add_branches(t)
-				if visited:
-					return visited
+	# grows the tree up to time t, redrawing if a simulator is attached
+	# should_stop is passed on to grow_to
+	def update(self, t, should_stop=None):
+		visited = self.grow_to(t, should_stop)
+		if visited:
+			return visited
 
+		if self.sim and self.name_to_node.get(0):
 			self.sim.display_sim(t)
 
 		return visited
 
+	# grows the tree up to time t without drawing anything, returning a path to the goal if one is found
+	# should_stop is an optional callable checked between branches to abandon growing early
+	# going back to a time already grown to only brings validity up to date, so it is shown as it was
+	def grow_to(self, t, should_stop=None):
+		if not self.name_to_node.get(0):
+			return None
+		if t <= self.top_time:
+			if not self.up_to_date(t):
+				self.validity(t)
+			return None
+
+		self.top_time = t
+		path = self.add_branches(t, should_stop)
+		if self.branch_weight_base is not None:
+			self.branch_weight = self.branch_weight_base + t
+		return path
+
 	# creates a node which is at the given x, y; connected to connections; and has a name
 	def add_node(self, loc, connection_nodes, t):
 		new_node = Node(self.rrt_index, loc, t)
@@ -102,6 +193,10 @@ class RRT(object):
 		self.data[new_node] = connections
 
 		self.name_to_node[self.rrt_index] = new_node
+		self.nodes.append(new_node)
+		if self.changed is not None:
+			self.changed.add(new_node)
+		self.index.add(new_node, loc[0], loc[1])
 
 		self.rrt_index += 1
 
@@ -114,20 +209,29 @@ class RRT(object):
 		self.connects[new_connect_name] = new_connect
 		return new_connect
 
-	# loops over all connections to a node and marks how long they are
-	def create_lengths(self, node, length_before, visited):
-		visited.append(node)
-		for connection in self.data[node]:
-			next_node = connection.end
-			if not next_node in visited:
-				length = (node.loc.subtract(next_node.loc).len() / RRT.traversal_rate
-					if (node and next_node) else 0) # distance between node and next_node
-				length_before += length
-				if connection.len is 0:
-					connection.len = length_before
-				if next_node.len is 0:
-					next_node.len = length_before
-				self.create_lengths(next_node, length_before, visited)
+	# returns the nodes which changed since the last call, every node on the first call
+	def take_changes(self):
+		changed = self.changed if self.changed is not None else set(self.nodes)
+		self.changed = set()
+		return changed
+
+	# the time the simbot takes to travel between two nodes
+	def travel_time(self, start, end):
+		return start.loc.subtract(end.loc).len() / self.traversal_rate
+
+	# marks how long it takes to reach every node below node, going through node
+	# only needed when something upstream changes; new branches are timed as they are added
+	def update_lengths(self, node):
+		to_visit = [node]
+		while to_visit:
+			trunk = to_visit.pop()
+			for connection in self.data[trunk]:
+				connection.len = trunk.len + self.travel_time(trunk, connection.end)
+				connection.end.len = connection.len
+				connection.end.depth = trunk.depth + 1
+				to_visit.append(connection.end)
+				if self.changed is not None:
+					self.changed.add(connection.end)
 
 	def node_name(self, node):
 		return str(node.name) if node else "None"
@@ -135,26 +239,47 @@ class RRT(object):
 	def connect_name(self, start, end):
 		return self.node_name(start) + ":" + self.node_name(end)
 
-	# creates a series of random branches off of each existing node
-	def add_branches(self, t):
+	# creates a series of random branches off of existing nodes
+	# each node grows a branch with probability branch_creation, so rather than asking every node,
+	# the number of branches is drawn from the matching binomial and that many trunks are picked
+	def add_branches(self, t, should_stop=None):
+		grown = len(self.nodes)
 		visited = None
-		data = self.data.copy()
-		for key in data.keys():
-			add_branch = random.random() <= self.update_branch_creation()
-			if add_branch:
-				new_visited = self.add_branch(key.name, t)
+
+		count = self.rng.binomial(len(self.nodes), self.update_branch_creation())
+		if count:
+			picked = self.rng.choice(len(self.nodes), count, replace=False)
+			trunks = [self.nodes[i] for i in picked]
+
+			for trunk, loc in self.sample_branches(trunks):
+				if should_stop and should_stop():
+					return visited
+				new_visited = self.grow(trunk, loc, t)
 				if new_visited:
 					visited = new_visited
+
+		if self.bidirectional and not visited:
+			visited = self.connect_trees(self.nodes[grown:], t)
 		return visited
 
 	# creates a branch in a random direction with given name off of given trunk
 	def add_branch(self, trunk_name, t):
 		trunk = self.name_to_node[trunk_name]
 
-		# find angle between the trunk node and the goal node
-		del_x = self.goal[0] - trunk[0]
-		del_y = self.goal[1] - trunk[1]
-		goal_a = math.atan(del_y/del_x)
+		for trunk, loc in self.sample_branches([trunk]):
+			return self.grow(trunk, loc, t)
+
+	# picks where a random branch off of each trunk ends, all at once
+	# returns a list of (trunk, location), leaving out any trunk which can't fit a branch in the bounds
+	def sample_branches(self, trunks):
+		x = np.array([trunk[0] for trunk in trunks], dtype=float)
+		y = np.array([trunk[1] for trunk in trunks], dtype=float)
+
+		# find angle between each trunk node and the goal node
+		del_x = self.goal[0] - x
+		del_y = self.goal[1] - y
+		vertical = del_x == 0
+		goal_a = np.where(vertical, np.copysign(math.pi/2, del_y), np.arctan(del_y / np.where(vertical, 1, del_x)))
 		# random number between [0, 2 pi), measured counterlockwise from the horizontal
 		# rand_a = ((random.random() - random.random() # random number in [-1, 1], weighted towards 0
 		# 		+ 1)*math.pi # random number in [0, 2pi], weighted towards pi
@@ -165,84 +290,510 @@ class RRT(object):
 		# 		+ 2*math.pi)/2 # [0, 2pi], weighted to 2pi
 		# 		+ (goal_a - math.pi) # weighted to goal_a
 		# 		) % 2*math.pi
-		rand_a = np.random.normal(goal_a, .2) % 2.0*math.pi
-
-		del_h = self.dist_to_goal(trunk)
+		rand_a = self.rng.normal(goal_a, .2) % 2.0*math.pi
 
-		while True:
-			rand_dist = random.random() * self.branch_len_max + self.branch_len_min
-			# rand_dist = random.random() * (del_h + 30) + (del_h - 30)
+		rand_x = np.empty(len(trunks))
+		rand_y = np.empty(len(trunks))
+		pending = np.arange(len(trunks))
 
-			rand_x = math.cos(rand_a) * rand_dist
-			rand_y = math.sin(rand_a) * rand_dist
-			rand_loc = Vector((rand_x, rand_y)).add(trunk.loc)
-			if rand_loc[0] > 0 and rand_loc[0] < 400 and rand_loc[1] > 0 and rand_loc[1] < 400:
-				# within the canvas
+		for turn in range(0, self.max_turns + 1):
+			if not len(pending):
 				break
 
-			rand_a += math.pi/10
-
-		new_branch = self.add_node(rand_loc, [], t)
-
-		dist_to_goal = self.dist_to_goal(new_branch)
-
-		new_connect = self.add_connect(trunk, new_branch, t)
+			rand_dist = self.rng.random(len(pending)) * self.branch_len_max + self.branch_len_min
+			rand_x[pending] = np.cos(rand_a[pending]) * rand_dist + x[pending]
+			rand_y[pending] = np.sin(rand_a[pending]) * rand_dist + y[pending]
+
+			# within the canvas
+			inside = ((rand_x[pending] > 0) & (rand_x[pending] < self.width) &
+				(rand_y[pending] > 0) & (rand_y[pending] < self.height))
+			pending = pending[~inside]
+			rand_a[pending] += math.pi/10
+
+		placed = np.ones(len(trunks), dtype=bool)
+		placed[pending] = False
+		return [(trunks[i], Vector((float(rand_x[i]), float(rand_y[i])))) for i in np.flatnonzero(placed)]
+
+	# creates a branch in the direction of sample off of the node nearest to it, as in a classic RRT
+	# the branch is no longer than branch_len_max; nothing is added if a node is already within
+	# min_branch_len of sample (as one on the goal is, once the goal has been sampled)
+	def extend(self, sample, t):
+		trunk = self.nearest(sample)[0]
+		offset = Vector((sample[0], sample[1])).subtract(trunk.loc)
+		dist = offset.len()
+		if dist < self.min_branch_len:
+			return None
+		if dist > self.branch_len_max:
+			offset = offset.scalar(self.branch_len_max / dist)
+
+		return self.grow(trunk, offset.add(trunk.loc), t)
+
+	# adds a node at loc connected to trunk
+	# returns a path to the goal if the tree now reaches it
+	def grow(self, trunk, loc, t):
+		if self.star:
+			return self.grow_star(trunk, loc, t)
+
+		new_branch = self.add_node(loc, [], t)
+		new_connect = self.attach(trunk, new_branch, t)
+		# until it's checked the connection is only as valid as its trunk, which validity relies on
+		# since it only walks down from connections whose blocked flag changes
+		new_connect.valid = trunk.valid
+		new_branch.valid = trunk.valid
+		if self.up_to_date(t):
+			# nothing else has changed, so only the new branch needs checking
+			self.branch_validity(new_connect, t)
+			if self.dist_to_goal(new_branch) <= self.success_radius:
+				return self.find_goal_path(new_branch)
+			return None
+
+		# any node near the goal may have become reachable
+		self.validity(t)
+		return self.goal_path()
+
+	# connects node to trunk, timing it from the trunk
+	def attach(self, trunk, node, t):
+		new_connect = self.add_connect(trunk, node, t)
 		self.data[trunk].append(new_connect)
-		self.create_lengths(self.first_node, 0, [])
-		self.validity(self.add_connect(None, self.first_node, 0), t)
+		node.parent = new_connect
+		node.depth = trunk.depth + 1
+		# reaching the new branch takes as long as reaching the trunk, plus the trip along the branch
+		new_connect.len = trunk.len + self.travel_time(trunk, node)
+		node.len = new_connect.len
+		return new_connect
 
-		if dist_to_goal <= self.success_radius:
-			visited = self.find_goal_path(new_branch, [])
-			# if visited:
-			# 	print "testing at", t
-			# 	for item in visited:
-			# 		print "visited: ", item
+	# whether validity is current at time t, so only new connections need checking
+	def up_to_date(self, t):
+		return t == self.valid_time or (self.space_time and self.valid_time is not None)
+
+	# adds a node at loc the RRT* way, joined to the nearby node reaching it soonest (trunk if none can)
+	# then moves nearby nodes onto it if that reaches them sooner
+	def grow_star(self, trunk, loc, t):
+		if not self.up_to_date(t):
+			self.validity(t)
+
+		parent = self.choose_parent(trunk, loc, t)
+		new_branch = self.add_node(loc, [], t)
+		self.branch_validity(self.attach(parent, new_branch, t), t)
+		self.rewire(new_branch, t)
+		return self.goal_path()
+
+	# the valid node among trunk and loc's nearest neighbours which reaches loc soonest along an
+	# unblocked connection, or trunk if there isn't one
+	def choose_parent(self, trunk, loc, t):
+		candidates = [node for node in self.nearest(loc, self.star_neighbours) if node.valid]
+		if trunk not in candidates:
+			candidates.append(trunk)
+		candidates.sort(key=lambda node: node.len + node.loc.dist(loc) / self.traversal_rate)
+
+		for node in candidates:
+			if node.valid and not self.edge_blocked(node, loc, t):
+				return node
+		return trunk
+
+	# moves each of node's nearest neighbours onto node if that gets the simbot there sooner
+	def rewire(self, node, t):
+		if not node.valid:
+			return
+
+		for neighbour in self.nearest(node.loc, self.star_neighbours + 1):
+			if neighbour is node or neighbour is self.first_node:
+				continue
+			length = node.len + self.travel_time(node, neighbour)
+			if length < neighbour.len and not self.edge_blocked(node, neighbour.loc, t, neighbour.t):
+				self.reparent(neighbour, node)
+
+	# whether a connection from start to loc, created at time created (t if not given), would be blocked
+	# checked at time t, or while it would be traversed in space_time mode
+	def edge_blocked(self, start, loc, t, created=None):
+		created = t if created is None else created
+		connection = Connection(start, Node(None, loc, created), created)
+		connection.len = start.len + self.travel_time(start, connection.end)
+		if self.space_time:
+			return self.blocked_during(connection, *self.traversal_window(connection))
+		return self.intersects_obs(connection, t)
+
+	# moves node, and everything below it, from its current parent onto new_parent
+	# the new connection must already be known to be unblocked
+	def reparent(self, node, new_parent):
+		old = node.parent
+		self.data[old.start].remove(old)
+		del self.connects[self.connect_name(old.start, node)]
+
+		new_connect = self.attach(new_parent, node, node.t)
+		self.update_lengths(node)
+		# nodes are no longer sure to come after their trunks, and are timed differently
+		self.snapshots.clear()
+		if self.changed is not None:
+			self.changed.add(node)
+
+		# the node may change state without its new connection doing so, so its children are walked too
+		to_visit = [new_connect] + self.data[node]
+		if self.space_time:
+			# everything below is now traversed at different times, so may be blocked differently
+			below = [node]
+			while below:
+				for connection in self.data[below.pop()]:
+					connection.blocked = self.blocked_during(connection, *self.traversal_window(connection))
+					to_visit.append(connection)
+					below.append(connection.end)
+		self.propagate_validity(to_visit)
+
+	# moves the goal, keeping the tree grown so far rather than starting again
+	# whether a node is valid doesn't depend on the goal, so only the nodes near the new goal are checked
+	# if the tree has more than max_nodes (self.max_nodes if not given), the least promising are pruned
+	# returns a path to the new goal if the tree already reaches it
+	def retarget(self, goal, t, max_nodes=None):
+		self.goal = Vector((goal[0], goal[1]))
+		self.goal_tree = None
+
+		if max_nodes is None:
+			max_nodes = self.max_nodes
+		if max_nodes is not None and len(self.nodes) > max_nodes:
+			self.prune(max_nodes)
+
+		if not self.up_to_date(t):
+			self.validity(t)
+		return self.goal_path()
+
+	# removes all but the keep most promising nodes
+	# a node's promise is the soonest the simbot could reach the goal by going straight there from it,
+	# or from anything below it, so a kept node's trunk is always kept too; invalid nodes go first
+	def prune(self, keep):
+		estimates = {}
+		for node in sorted(self.nodes, key=lambda node: -node.depth):
+			estimate = node.t + node.len + self.dist_to_goal(node) / self.traversal_rate if node.valid else math.inf
+			estimates[node] = min(estimates.get(node, math.inf), estimate)
+			if node.parent:
+				trunk = node.parent.start
+				estimates[trunk] = min(estimates.get(trunk, math.inf), estimates[node])
+
+		ranked = sorted(self.nodes, key=lambda node: (estimates[node], node.depth))
+		for node in ranked[max(keep, 1):]:
+			self.remove_node(node)
+		self.nodes = [node for node in self.nodes if node in self.data]
+		self.snapshots.clear()
+
+	# forgets a node and the connection leading to it, leaving RRT.nodes to the caller
+	def remove_node(self, node):
+		del self.data[node]
+		del self.name_to_node[node.name]
+		self.index.remove(node, node.loc[0], node.loc[1])
+		if node.parent:
+			del self.connects[self.connect_name(node.parent.start, node)]
+			if node.parent.start in self.data: # unless the trunk went first
+				self.data[node.parent.start].remove(node.parent)
+		if self.changed is not None:
+			self.changed.discard(node)
+
+	# tries to join each of the grown nodes to the goal tree, then grows the goal tree by as many nodes
+	# toward random samples and tries to join each of those to this tree, as in RRT-Connect
+	# returns a path to the goal through the first join that is clear, or None
+	def connect_trees(self, grown, t):
+		if self.goal_tree is None or self.goal_tree.root.loc is not self.goal:
+			self.goal_tree = GoalTree(self.goal, self.traversal_rate, self.branch_len_max)
+		if not self.up_to_date(t):
+			self.validity(t)
+
+		for node in grown:
+			if node.valid:
+				for goal_node in self.goal_tree.nearest(node.loc, self.connect_neighbours):
+					path = self.join(node, goal_node, t)
+					if path:
+						return path
+
+		for i in range(0, max(len(grown), 1)):
+			goal_node = self.goal_tree.extend((self.rng.random() * self.width, self.rng.random() * self.height))
+			for node in self.nearest(goal_node.loc, self.connect_neighbours):
+				if node.valid:
+					path = self.join(node, goal_node, t)
+					if path:
+						return path
+
+		return None
+
+	# joins node to goal_node, at time t, if the route from node through the goal tree to the goal is clear
+	# the route is copied into this tree, and the path along it returned; otherwise returns None
+	def join(self, node, goal_node, t):
+		if node.loc.dist(goal_node.loc) > self.branch_len_max:
+			return None
+		route = self.goal_tree.route(goal_node)
+		if self.route_blocked(node, route, t):
+			return None
+
+		trunk = node
+		for goal_node in route:
+			new_branch = self.add_node(goal_node.loc, [], t)
+			self.attach(trunk, new_branch, t)
+			trunk = new_branch
+		return self.find_goal_path(trunk)
+
+	# whether the route from node along the goal tree nodes would be blocked, if set off on at time t
+	# the goal tree's nodes don't know when they're reached until now, so this is where the route's
+	# timing is worked out: in space_time mode each edge is checked while the simbot would be on it
+	def route_blocked(self, node, route, t):
+		first = (node.loc[0], node.loc[1], route[0].loc[0], route[0].loc[1])
+		edges = [first] + [(goal_node.loc[0], goal_node.loc[1], goal_node.next.loc[0], goal_node.next.loc[1])
+			for goal_node in route[:-1]]
+		if not self.space_time:
+			return bool(self.edges_blocked(np.array(edges, dtype=float), t).any())
+
+		# set off along the first edge when node is reached, then along the goal tree
+		set_off = t + node.len
+		reached = set_off + node.loc.dist(route[0].loc) / self.traversal_rate
+		if overlaps_intervals(blocked_intervals(first, self.obstacles, 0, self.horizon, self.interval_resolution),
+				set_off, reached):
+			return True
+		for goal_node, edge in zip(route[:-1], edges[1:]):
+			if goal_node.intervals is None:
+				goal_node.intervals = blocked_intervals(edge, self.obstacles, 0, self.horizon, self.interval_resolution)
+			set_off = reached
+			reached = set_off + goal_node.len - goal_node.next.len
+			if overlaps_intervals(goal_node.intervals, set_off, reached):
+				return True
+		return False
 
-			return visited
+	# keeps growing the tree, RRT* style, toward random samples (and sometimes the goal) at time t
+	# until budget seconds have passed, returning the path which reaches the goal soonest
+	def improve(self, t, budget):
+		star = self.star
+		self.star = True
+		deadline = time.perf_counter() + budget
+		best = self.goal_path()
+		try:
+			while time.perf_counter() < deadline:
+				if self.rng.random() < self.goal_bias:
+					sample = self.goal
+				else:
+					sample = (self.rng.random() * self.width, self.rng.random() * self.height)
+				path = self.extend(sample, t)
+				if path and (best is None or path_arrival(path) < path_arrival(best)):
+					best = path
+		finally:
+			self.star = star
+
+		# rewiring may have moved the nodes of best since it was found
+		return self.goal_path() or best
+
+	# the nodes within k of loc, nearest first
+	def nearest(self, loc, k=1):
+		return self.index.nearest(loc[0], loc[1], k)
+
+	# every node within r of loc
+	def near(self, loc, r):
+		return self.index.within(loc[0], loc[1], r)
+
+	# every node close enough to the goal to count as reaching it
+	def goal_nodes(self):
+		return self.near(self.goal, self.success_radius)
+
+	# finds a path to the valid node near the goal which is reached first, or None if there isn't one
+	def goal_path(self):
+		best = None
+		for node in self.goal_nodes():
+			if node.valid and (best is None or node.t + node.len < best.t + best.len):
+				best = node
+
+		return self.find_goal_path(best) if best else None
+
+	# finds a path from to_find back to the base by following parents
+	# returns the connections walked, or None if one of them isn't valid
+	def find_goal_path(self, to_find, visited=None):
+		if visited is None:
+			visited = []
+
+		node = to_find
+		while node is not self.first_node:
+			connection = node.parent
+			if not connection or not connection.valid: # the connection to the node isn't valid
+				return None
+			visited.append(connection)
+			node = connection.start
 
-	# finds a path from to_find to the goal
-	def find_goal_path(self, to_find, visited):
+		return visited
 
-		if to_find is self.first_node:
-			# visited.append(self.first_node)
-			return visited
+	# returns the path from the base to node as rows of [x, y, arrival time], for handing to a controller
+	def waypoints(self, node):
+		rows = np.empty((node.depth + 1, 3))
+		for i in range(node.depth, -1, -1):
+			rows[i] = (node.loc[0], node.loc[1], node.t + node.len)
+			node = node.parent.start if node.parent else None
+		return rows
 
-		for node, connections in self.data.items():
-			# find a node which connects to to_find
-			for connection in connections:
-				if to_find is connection.end:
-					if not connection.valid: # the connection to the node isn't valid
-						return None
-					visited.append(connection)
-					# then look for a node which connects to that one
-					return self.find_goal_path(node, visited)
+	# copies the tree into a compact, array backed TreeStore, see TreeStore.from_rrt
+	def to_store(self):
+		return TreeStore.from_rrt(self)
 
 	# the distance between the goal and the node
 	def dist_to_goal(self, node):
 		return node.loc.subtract(self.goal).len()
 
-	# check validity of node paths, moves downards through connections to in_connect.end
-	def validity(self, in_connect, t):
-		for connection in self.data[in_connect.end]:
-			connection.valid = True
-			connection.end.valid = True
-			if self.intersects_obs(connection, t):
-				connection.valid = False
-			# if this node isn't valid, nothing it connects to is
-			# ignore the way you came from
-			if (((not connection.valid) or (not in_connect.valid)) and 
-				in_connect.end is not connection.end):
-				connection.valid = False
-				connection.end.valid = False
-			if in_connect.end is not connection.end:
-				self.validity(connection, t)
+	# replaces the obstacles, so validity has to be checked again from scratch
+	def set_obstacles(self, obstacles):
+		self.obstacles = obstacles
+		self.motion = None
+		self.occupancy = None
+		self.pose_cache.clear()
+		self.snapshots.clear()
+		self.valid_time = None
+		for connections in self.data.values():
+			for connection in connections:
+				connection.intervals = None
+		if self.goal_tree:
+			for goal_node in self.goal_tree.nodes:
+				goal_node.intervals = None
+
+	# check validity of every node path at time t
+	# every connection is tested again, but only subtrees whose root changed state are walked
+	# times already checked are restored from their snapshots instead, see restore_validity
+	def validity(self, t):
+		if not self.space_time and self.restore_validity(t):
+			return
+
+		connections = [connection for connections in self.data.values() for connection in connections]
+
+		if self.space_time:
+			mask = [self.blocked_during(connection, *self.traversal_window(connection)) for connection in connections]
+		else:
+			mask = self.blocked_mask(connections, t)
+
+		to_visit = []
+		for connection, blocked in zip(connections, mask):
+			if connection.blocked != blocked:
+				connection.blocked = blocked
+				to_visit.append(connection)
+
+		self.propagate_validity(to_visit)
+		self.valid_time = t
+		if not self.space_time:
+			self.store_validity(t)
+
+	# the nodes whose valid flag differs from checking every connection again from scratch at time t
+	# (over its traversal window in space_time mode); always empty unless the incremental updates have a bug
+	def validity_errors(self, t):
+		connections = [node.parent for node in self.nodes if node.parent]
+		if self.space_time:
+			mask = [self.blocked_during(connection, *self.traversal_window(connection)) for connection in connections]
+		else:
+			mask = self.blocked_mask(connections, t)
+
+		expected = {self.first_node: True}
+		for connection, blocked in sorted(zip(connections, mask), key=lambda pair: pair[0].end.depth):
+			expected[connection.end] = expected[connection.start] and not blocked
+		return [node for node in self.nodes if node.valid != expected[node]]
+
+	# keeps the validity of every node at time t, see ValiditySnapshots
+	def store_validity(self, t):
+		count = len(self.nodes)
+		valid = np.fromiter((node.valid for node in self.nodes), dtype=bool, count=count)
+		blocked = np.fromiter((node.parent is not None and node.parent.blocked for node in self.nodes),
+			dtype=bool, count=count)
+		return self.snapshots.put(t, valid, blocked)
+
+	# brings validity back to how it was at time t, if it was checked then and kept
+	# the snapshot of the current validity (at valid_time) says which nodes are already right, so only
+	# the nodes which differ are touched, and nodes added since the snapshot at t are checked at t
+	# returns False if there's no snapshot at t
+	def restore_validity(self, t):
+		target = self.snapshots.get(t)
+		if target is None:
+			return False
+
+		current = self.snapshots.peek(self.valid_time) if self.valid_time is not None else None
+		if current is None:
+			changed = range(0, target.count)
+		else:
+			# nodes added since the current snapshot was taken may differ from the target too
+			changed = np.concatenate((target.differences(current),
+				np.arange(min(current.count, target.count), target.count)))
+
+		for i in changed:
+			node = self.nodes[int(i)]
+			node.valid, blocked = target.bits(int(i))
+			if node.parent:
+				node.parent.valid = node.valid
+				node.parent.blocked = blocked
+			if self.changed is not None:
+				self.changed.add(node)
+
+		# nodes always come after their trunks, so the added ones can be checked in order
+		added = self.nodes[target.count:]
+		if added:
+			mask = self.blocked_mask([node.parent for node in added], t)
+			for node, blocked in zip(added, mask):
+				connection = node.parent
+				connection.blocked = bool(blocked)
+				connection.valid = connection.start.valid and not connection.blocked
+				node.valid = connection.valid
+				if self.changed is not None:
+					self.changed.add(node)
+
+		self.valid_time = t
+		if added:
+			self.store_validity(t)
+		return True
+
+	# updates the validity of each of the connections, and of everything below any that change
+	def propagate_validity(self, to_visit):
+		while to_visit:
+			connection = to_visit.pop()
+			# if the trunk isn't valid, nothing it connects to is
+			valid = connection.start.valid and not connection.blocked
+			if valid != connection.valid or valid != connection.end.valid:
+				connection.valid = valid
+				connection.end.valid = valid
+				if self.changed is not None:
+					self.changed.add(connection.end)
+				to_visit.extend(self.data[connection.end])
+
+	# checks a connection which was just added to a tree that is already valid at time t
+	def branch_validity(self, connection, t):
+		if self.space_time:
+			connection.blocked = self.blocked_during(connection, *self.traversal_window(connection))
+		else:
+			connection.blocked = self.intersects_obs(connection, t)
+		connection.valid = connection.start.valid and not connection.blocked
+		connection.end.valid = connection.valid
+
+	# the times the simbot sets off along the connection and arrives at its end
+	def traversal_window(self, connection):
+		return (connection.t + connection.start.len, connection.t + connection.len)
+
+	# the sorted, disjoint intervals of time, up to horizon, during which an obstacle crosses the connection
+	# worked out the first time they are needed and then kept on the connection
+	def blocked_intervals(self, connection):
+		if connection.intervals is None:
+			edge = (connection.start.loc[0], connection.start.loc[1], connection.end.loc[0], connection.end.loc[1])
+			connection.intervals = blocked_intervals(edge, self.obstacles, 0, self.horizon, self.interval_resolution)
+		return connection.intervals
+
+	# whether an obstacle crosses the connection at time t
+	def blocked_at(self, connection, t):
+		return in_intervals(self.blocked_intervals(connection), t)
+
+	# whether an obstacle crosses the connection at any time between t0 and t1
+	def blocked_during(self, connection, t0, t1):
+		return overlaps_intervals(self.blocked_intervals(connection), t0, t1)
+
+	# returns a mask which is True for each connection that intersects any obstacle at time t
+	def blocked_mask(self, connections, t):
+		return self.edges_blocked(connection_edges(connections), t)
+
+	# the same, for an array of edges with rows of [x1, y1, x2, y2]
+	def edges_blocked(self, edges, t):
+		if self.occupancy is not None and self.occupancy.covers(t):
+			return self.occupancy.segments_blocked(edges, t)
+		return edges_blocked(edges, self.obstacles, t, self.pose_cache, self.obstacle_motion(), self.separating_axis)
+
+	# the obstacles' velocities, starting points and sizes, kept until the obstacles change
+	def obstacle_motion(self):
+		if self.motion is None:
+			self.motion = obstacle_motion(self.obstacles)
+		return self.motion
 
 	# Returns true if the connection intersects any obstacle
 	def intersects_obs(self, connection, t):
-		for obstacle in self.sim.obstacles:
-			if self.intersects_ob(connection, obstacle, t):
-				return True
-		return False
+		return bool(self.blocked_mask([connection], t)[0])
 
 	# Checks each side of the obstacle and see if it intersects the connection
 	# see https://www.cdn.geeksforgeeks.org/check-if-two-given-line-segments-intersect/
@@ -269,12 +820,14 @@ class RRT(object):
 	# see https://www.desmos.com/calculator/2iovtlu2fn for average nodes created each loop cycle
 	# both are based on the number of existing nodes
 	def update_branch_creation(self):
-		self.branch_creation = 1 - math.tanh(len(self.data)/RRT.branch_weight)
+		self.branch_creation = 1 - math.tanh(len(self.data)/self.branch_weight)
 		return self.branch_creation
 
 
 # represents a single node in the rrt
 class Node(object):
+	__slots__ = ("name", "size", "loc", "t", "len", "parent", "depth", "valid")
+
 	def __init__(self, name, loc, t):
 		self.name = name
 		self.size = 7
@@ -282,6 +835,9 @@ class Node(object):
 		self.t = t
 		self.len = 0
 
+		self.parent = None # the connection leading to this node
+		self.depth = 0 # how many connections lie between this node and the base
+
 		self.valid = True
 
 	def __getitem__(self, index):
@@ -292,6 +848,7 @@ class Node(object):
 
 # connects two nodes
 class Connection(object):
+	__slots__ = ("start", "end", "t", "len", "valid", "blocked", "intervals")
 
 	def __init__(self, start, end, t):
 		self.start = start
@@ -300,6 +857,8 @@ class Connection(object):
 		self.len = 0
 
 		self.valid = True
+		self.blocked = False # whether this connection itself crosses an obstacle
+		self.intervals = None # the times this connection is blocked, see RRT.blocked_intervals
 		# self.valid = end.name is not 1
 
 	def __str__(self):
@@ -320,9 +879,12 @@ class Connection(object):
 			(self.end[0] - self.start[0]) * (vector[1] - self.end[1]))
 		return direction > 0
 
-def main():
+# the time at which a path (as returned by RRT.find_goal_path) reaches its last node
+def path_arrival(path):
+	return path[0].end.t + path[0].end.len
 
-	null = Vector((0, 0, 0))
+# the obstacles of the example scene
+def default_obstacles():
 
 	# one pentagon, one not square to the axes, and one with a velocity
 	ob1 = Shape((
@@ -334,9 +896,6 @@ def main():
 		),
 		Vector((100, 100, 0)), Vector((30, -30, 0)))
 
-	line = Connection(Vector((200, 180)), Vector((160.308, 314.109)), 0)
-	# side = Connection(Vector((0, 0)), Vector((100, 0)), 0)
-
 	ob2 = Shape((
 		Vector((0, -40)), 
 		Vector((40, 0)), 
@@ -361,11 +920,37 @@ def main():
 		), 
 		Vector((50, 300, 0)), Vector((30, -10, 0)))
 
-	obstacles = (ob1, ob2, ob3, ob4)
+	return (ob1, ob2, ob3, ob4)
+
+# count random polygons scattered over a width x height canvas, each drifting and spinning at its own speed
+# the same seed always gives the same obstacles
+def random_obstacles(count, seed=None, width=400, height=400):
+	rng = np.random.default_rng(seed)
+	# keep the total area covered roughly the same however many obstacles there are
+	size = min(40.0, max(4.0, 0.3 * math.sqrt(width * height / max(count, 1))))
+
+	obstacles = []
+	for i in range(0, count):
+		sides = int(rng.integers(3, 7))
+		angles = np.sort(rng.random(sides)) * 2.0*math.pi
+		radii = rng.uniform(.5, 1, sides) * size
+		points = tuple(Vector((float(r * math.cos(a)), float(r * math.sin(a)))) for a, r in zip(angles, radii))
+		t0 = Vector((float(rng.random() * width), float(rng.random() * height), float(rng.random() * 2.0*math.pi)))
+		velocity = Vector((float(rng.normal(0, 10)), float(rng.normal(0, 10)), float(rng.normal(0, .3))))
+		obstacles.append(Shape(points, t0, velocity))
+	return tuple(obstacles)
+
+def main():
+	# the GUI is only imported here, so importing the planner never needs a display
+	import tkinter as tk
+	from simulator import Simulator
+
+	obstacles = default_obstacles()
 
 	root = tk.Tk()
-	rrt = RRT(root)
-	sim = Simulator(root, obstacles, rrt)
+	rrt = RRT(root, obstacles)
+	# the tree grows on a worker thread, so the window never waits for it
+	sim = Simulator(root, obstacles, rrt, background=True)
 	rrt.sim = sim
 
 	# print rrt.intersects_obs(line)
@@ -0,0 +1,233 @@
+import json
+import struct
+
+from linalgebra import *
+from planner import plan
+from rrt import RRT, default_obstacles
+
+# magic bytes starting every binary scenario record
+magic = b"TOBS"
+binary_version = 1
+
+# one planning problem: the obstacles, where the simbot starts and where it's heading, plus any
+# of RRT's tuning constants to override
+class Scenario(object):
+
+	# the RRT constants a scenario may set, in the order the binary form numbers them
+	settings_names = ("traversal_rate", "branch_len_min", "branch_len_max", "branch_weight",
+		"success_radius", "width", "height", "max_turns", "horizon", "interval_resolution",
+		"star", "star_neighbours", "goal_bias", "bidirectional", "connect_neighbours",
+		"separating_axis", "branch_weight_base", "space_time")
+
+	# settings counting something, which must be at least 1
+	count_names = ("star_neighbours", "connect_neighbours")
+
+	def __init__(self, obstacles, base, goal, max_time=RRT.forward, seed=None, time_step=RRT.time_step,
+			settings=None, name=None):
+		self.obstacles = tuple(obstacles)
+		self.base = (float(base[0]), float(base[1]))
+		self.goal = (float(goal[0]), float(goal[1]))
+		self.max_time = float(max_time)
+		self.seed = seed
+		self.time_step = float(time_step)
+		self.settings = dict(settings or {})
+		self.name = name
+
+		for setting in self.settings:
+			if setting not in Scenario.settings_names:
+				raise ValueError("unknown setting: " + str(setting))
+		for setting in Scenario.count_names:
+			value = self.settings.get(setting, 1)
+			if value != int(value) or value < 1:
+				raise ValueError(setting + " must be a whole number of at least 1, not " + str(value))
+			if setting in self.settings:
+				self.settings[setting] = int(value)
+
+	# a setting read back from the binary form, where every value is a double, as the type RRT gives it
+	# so counts and flags come back as ints and bools; an int setting given a fraction stays a float
+	@staticmethod
+	def setting_value(setting, value):
+		kind = type(getattr(RRT, setting))
+		if kind is bool:
+			return bool(value)
+		if kind is int and value.is_integer():
+			return int(value)
+		return value
+
+	def __str__(self):
+		return ("Scenario: [" + str(self.name) + " " + str(len(self.obstacles)) + " obstacles " +
+			str(self.base) + " to " + str(self.goal) + "]")
+
+	# the example scene from rrt.main
+	@classmethod
+	def default(cls):
+		return cls(default_obstacles(), (200, 180), (300, 350), name="default")
+
+	def plan(self, **kwargs):
+		return plan(self.obstacles, self.base, self.goal, self.max_time, self.seed, self.time_step,
+			settings=self.settings, **kwargs)
+
+	# the scenario as plain lists and dicts, for JSON
+	def to_dict(self):
+		return {
+			"name": self.name,
+			"base": list(self.base),
+			"goal": list(self.goal),
+			"max_time": self.max_time,
+			"seed": self.seed,
+			"time_step": self.time_step,
+			"settings": self.settings,
+			"obstacles": [{
+				"points": [[point[0], point[1]] for point in obstacle.points],
+				"t0": [obstacle.t0[0], obstacle.t0[1], obstacle.t0[2]],
+				"velocity": [obstacle.velocity[0], obstacle.velocity[1], obstacle.velocity[2]],
+			} for obstacle in self.obstacles],
+		}
+
+	@classmethod
+	def from_dict(cls, data):
+		obstacles = []
+		for obstacle in data["obstacles"]:
+			points = tuple(Vector((point[0], point[1])) for point in obstacle["points"])
+			obstacles.append(Shape(points, Vector(tuple(obstacle["t0"])), Vector(tuple(obstacle["velocity"]))))
+		return cls(obstacles, data["base"], data["goal"], data.get("max_time", RRT.forward), data.get("seed"),
+			data.get("time_step", RRT.time_step), data.get("settings"), data.get("name"))
+
+	def to_json(self, **kwargs):
+		return json.dumps(self.to_dict(), **kwargs)
+
+	@classmethod
+	def from_json(cls, text):
+		return cls.from_dict(json.loads(text))
+
+	# the scenario as a compact binary record, starting with its own length so records can be streamed
+	def to_bytes(self):
+		name = (self.name or "").encode("utf-8")
+		body = [struct.pack("<H", binary_version),
+			struct.pack("<6d", self.base[0], self.base[1], self.goal[0], self.goal[1], self.max_time, self.time_step),
+			struct.pack("<q", -1 if self.seed is None else self.seed),
+			struct.pack("<H", len(name)), name,
+			struct.pack("<B", len(self.settings))]
+		for setting, value in self.settings.items():
+			body.append(struct.pack("<Bd", Scenario.settings_names.index(setting), value))
+
+		body.append(struct.pack("<I", len(self.obstacles)))
+		for obstacle in self.obstacles:
+			body.append(struct.pack("<H", len(obstacle.points)))
+			body.append(struct.pack("<6d", obstacle.t0[0], obstacle.t0[1], obstacle.t0[2],
+				obstacle.velocity[0], obstacle.velocity[1], obstacle.velocity[2]))
+			body.append(obstacle.array.astype("<f8").tobytes())
+
+		body = b"".join(body)
+		return magic + struct.pack("<I", len(body)) + body
+
+	@classmethod
+	def from_bytes(cls, data):
+		if data[:4] != magic:
+			raise ValueError("not a binary scenario")
+		reader = Reader(data, 8)
+		version, = reader.read("<H")
+		if version != binary_version:
+			raise ValueError("unsupported binary scenario version: " + str(version))
+
+		base_x, base_y, goal_x, goal_y, max_time, time_step = reader.read("<6d")
+		seed, = reader.read("<q")
+		name_length, = reader.read("<H")
+		name = reader.take(name_length).decode("utf-8") or None
+
+		settings = {}
+		for i in range(0, reader.read("<B")[0]):
+			index, value = reader.read("<Bd")
+			setting = Scenario.settings_names[index]
+			settings[setting] = Scenario.setting_value(setting, value)
+
+		obstacles = []
+		for i in range(0, reader.read("<I")[0]):
+			count, = reader.read("<H")
+			t0_x, t0_y, t0_a, v_x, v_y, v_a = reader.read("<6d")
+			coords = struct.unpack("<" + str(2 * count) + "d", reader.take(16 * count))
+			points = tuple(Vector((coords[j], coords[j + 1])) for j in range(0, 2 * count, 2))
+			obstacles.append(Shape(points, Vector((t0_x, t0_y, t0_a)), Vector((v_x, v_y, v_a))))
+
+		return cls(obstacles, (base_x, base_y), (goal_x, goal_y), max_time, None if seed < 0 else seed,
+			time_step, settings, name)
+
+# reads structs one after another out of a bytes object
+class Reader(object):
+
+	def __init__(self, data, offset=0):
+		self.data = data
+		self.offset = offset
+
+	def take(self, size):
+		chunk = self.data[self.offset:self.offset + size]
+		if len(chunk) != size:
+			raise ValueError("truncated binary scenario")
+		self.offset += size
+		return chunk
+
+	def read(self, layout):
+		return struct.unpack(layout, self.take(struct.calcsize(layout)))
+
+# parses one record with parse, or if skip_errors is True returns the exception a bad record raises
+# instead, so the records after it can still be read
+def parse_record(parse, record, skip_errors):
+	if not skip_errors:
+		return parse(record)
+	try:
+		return parse(record)
+	except Exception as error:
+		return error
+
+# yields each scenario in a stream of binary records, reading one record at a time
+# with skip_errors, a record which can't be read is yielded as the exception it raised, see parse_record
+def read_binary(stream, skip_errors=False):
+	while True:
+		header = stream.read(8)
+		if not header:
+			return
+		# without a header there's no telling where the next record starts
+		if len(header) != 8 or header[:4] != magic:
+			raise ValueError("not a binary scenario")
+		length, = struct.unpack("<I", header[4:])
+		yield parse_record(Scenario.from_bytes, header + stream.read(length), skip_errors)
+
+# yields each scenario in a text stream holding either one JSON scenario or one per line (JSON Lines)
+# with skip_errors, a scenario which can't be read is yielded as the exception it raised, see parse_record
+def read_json(stream, skip_errors=False):
+	first = stream.readline()
+	rest = stream.readline()
+	# a scenario spread over several lines is a single JSON document
+	if first.strip() and rest.strip() and not rest.lstrip().startswith("{"):
+		yield parse_record(Scenario.from_json, first + rest + stream.read(), skip_errors)
+		return
+
+	for line in (first, rest):
+		if line.strip():
+			yield parse_record(Scenario.from_json, line, skip_errors)
+	for line in stream:
+		if line.strip():
+			yield parse_record(Scenario.from_json, line, skip_errors)
+
+# yields every scenario in the file at path, binary if it starts with the magic bytes, JSON otherwise
+def read_scenarios(path, skip_errors=False):
+	with open(path, "rb") as stream:
+		binary = stream.read(4) == magic
+	if binary:
+		with open(path, "rb") as stream:
+			for scenario in read_binary(stream, skip_errors):
+				yield scenario
+	else:
+		with open(path) as stream:
+			for scenario in read_json(stream, skip_errors):
+				yield scenario
+
+def write_binary(path, scenarios):
+	with open(path, "wb") as stream:
+		for scenario in scenarios:
+			stream.write(scenario.to_bytes())
+
+def write_json_lines(path, scenarios):
+	with open(path, "w") as stream:
+		for scenario in scenarios:
+			stream.write(scenario.to_json() + "\n")
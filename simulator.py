@@ -1,11 +1,16 @@
 import tkinter as tk
 
+import bisect
+import contextlib
 import math
 
+from background import BackgroundPlanner
 from linalgebra import *
+from posecache import PoseCache
 
 class Simulator(object):
-	def __init__(self, root, obstacles, rrt):
+	# if background is True the tree is grown on a worker thread, see BackgroundPlanner
+	def __init__(self, root, obstacles, rrt, background=False):
 		self.canvas = None
 		self.root = root
 
@@ -14,19 +19,41 @@ class Simulator(object):
 
 		self.obstacles = obstacles
 		self.rrt = rrt
+		# the planner collides against the same obstacles that are drawn
+		self.rrt.set_obstacles(obstacles)
+
+		self.planner = BackgroundPlanner(rrt) if background else None
+		# the worker places obstacles with the planner's pose cache, so the window needs its own
+		self.pose_cache = PoseCache(rrt.pose_cache_size) if background else rrt.pose_cache
+		self.frame_interval = 16 # milliseconds between frames in the background, about 60 a second
+		self.pending = set() # nodes the worker changed which haven't been drawn yet
+		self.display_time = None # the time on the slider, once it has been moved
+		self.frame_due = False # whether anything has changed since the last frame
 
 		self.obstacle_pointers = {}
 		self.centroid_pointers = {}
 		self.rrt_node_pointers = {}
 		self.rrt_connection_pointers = {}
 		self.rrt_label_pointers = {}
+		self.connection_starts = {} # node -> the node its connection was drawn from, which RRT* can change
 		self.timestamp_pointer = None
+		self.base_pointer = None
+		self.goal_pointers = None
 
 		self.finish_time = -1
 		self.visited = []
 		self.visited_nodes = []
+		self.visited_set = set() # visited_nodes, for quick lookups
 		self.to_end = None
 
+		# what each node (and the connection leading to it) was last drawn as, so only changes are redrawn
+		self.node_states = {} # node -> (visible, color, trunk, len)
+		self.node_arrivals = {} # node -> the arrival time it is sorted by below
+		self.arrival_times = [] # sorted times at which nodes appear
+		self.arrival_nodes = [] # the node appearing at each of arrival_times
+		self.drawn_time = 0 # the time of the last frame
+		self.drawn_finish = False # whether the last frame was at the finish time
+
 		self.start_draw()
 
 	def start_draw(self):
@@ -41,9 +68,45 @@ class Simulator(object):
 
 		self.canvas.bind("<Button-1>", self.set_goal)
 
+	# starts planning toward where was clicked, or moves the goal there if already planning
 	def set_goal(self, event):
-		self.rrt.goal = Vector((event.x, event.y))
-		self.start_prog()
+		goal = Vector((event.x, event.y))
+		if not self.rrt.nodes:
+			self.rrt.goal = goal
+			self.start_prog()
+		else:
+			self.retarget(goal)
+
+	# moves the goal, keeping the tree grown so far and any drawing of it that's still needed
+	def retarget(self, goal):
+		t = self.time.get()
+		old_path = self.visited_set
+		self.finish_time = -1
+		self.visited = []
+		self.visited_nodes = []
+		self.visited_set = set()
+		if self.to_end:
+			self.canvas.delete(self.to_end)
+			self.to_end = None
+
+		with self.tree_lock():
+			# the old path is no longer the path, so its nodes are drawn again
+			# with a worker they go straight to pending, as changes already taken won't be sent again
+			if self.planner:
+				self.pending.update(old_path)
+			elif self.rrt.changed is not None:
+				self.rrt.changed.update(old_path)
+			visited = self.rrt.retarget(goal, t)
+			for node in [node for node in self.node_arrivals if not node in self.rrt.data]:
+				self.forget_node(node)
+			if self.planner:
+				self.pending.update(self.rrt.take_changes())
+				self.pending = set(node for node in self.pending if node in self.rrt.data)
+
+		self.draw_goal()
+		self.time.configure(activebackground='orchid3', troughcolor='orchid1')
+		self.found_goal(visited, t)
+		self.display_sim(t)
 
 	def start_prog(self, event=None):
 		visited = self.rrt.create_rrt()
@@ -59,11 +122,42 @@ class Simulator(object):
 		self.time = time
 		self.time.config(state="normal")
 
+		if self.planner:
+			self.planner.start()
+			self.root.after(self.frame_interval, self.poll)
+
 	def stop_prog(self, event=None):
+		if self.planner:
+			self.planner.stop(1)
 		self.root.quit()
 
+	# held while reading or changing the tree, so the worker doesn't change it at the same time
+	def tree_lock(self):
+		return self.planner.lock if self.planner else contextlib.nullcontext()
+
+	# applies whatever the worker has sent since the last frame, then draws a frame if anything changed
+	def poll(self):
+		for t, changes, visited in self.planner.take_deltas():
+			self.pending.update(changes)
+			self.found_goal(visited, t)
+			self.frame_due = True
+
+		if self.frame_due and self.display_time is not None:
+			self.display_sim(self.display_time)
+		self.root.after(self.frame_interval, self.poll)
+
 	def display_sim(self, t, event=None):
-		self.draw_rrt(t)
+		if not self.planner:
+			self.draw_rrt(t)
+			self.frame_due = False
+		elif self.planner.lock.acquire(blocking=False):
+			try:
+				self.draw_rrt(t)
+				self.frame_due = False
+			finally:
+				self.planner.lock.release()
+		# otherwise the worker is busy with the tree, which is drawn on a later frame
+
 		self.draw_obstacles(t)
 		self.draw_base()
 		self.draw_timestamp(t)
@@ -73,14 +167,25 @@ class Simulator(object):
 	# updates the rrt, generating more nodes
 	def update(self, event=None):
 		curr_t = self.time.get()
+		if self.planner:
+			# the worker grows the tree, and the next frame draws it
+			self.planner.request(curr_t)
+			self.display_time = curr_t
+			self.frame_due = True
+			return
+
 		visited = self.rrt.update(curr_t)
-		self.rrt.branch_weight = 5 + curr_t
+		self.found_goal(visited, curr_t)
+
+	# stops the slider at the finish time once there's a path to the goal, otherwise lets it go further
+	def found_goal(self, visited, curr_t):
 		# found a goal node
 		if visited and self.finish_time is -1:
 			max_time = (visited[0].end.t + visited[0].end.len + .1)
 
 			for item in visited:
 				self.visited_nodes.append(item.end)
+				self.visited_set.add(item.end)
 				print ("visited", item.end)
 
 			print ("time: ", max_time)
@@ -101,96 +206,177 @@ class Simulator(object):
 
 	# draws a dot for the robot
 	def draw_base(self):
-		self.canvas.create_oval(self.draw_dot((
-			self.rrt.base[0], 
-			self.rrt.base[1]),
-			self.rrt.size), 
-			fill='green')
+		dot = self.draw_dot((self.rrt.base[0], self.rrt.base[1]), self.rrt.size)
+		if not self.base_pointer:
+			self.base_pointer = self.canvas.create_oval(dot, fill='green')
+		else:
+			self.canvas.coords(self.base_pointer, dot)
+			self.canvas.tag_raise(self.base_pointer)
 
 	# draws a dot for the goal node
 	def draw_goal(self):
-		self.canvas.create_oval(self.draw_dot((
-			self.rrt.goal[0], 
-			self.rrt.goal[1]),
-			self.rrt.size), 
-			fill='dodger blue')
-		self.canvas.create_text(
-			self.rrt.goal[0],
-			self.rrt.goal[1] - 14,
-			fill='black',
-			text='Goal')
-
-	# draws the rrt by looping over each node and each node's connections to other nodes
+		dot = self.draw_dot((self.rrt.goal[0], self.rrt.goal[1]), self.rrt.size)
+		if not self.goal_pointers:
+			self.goal_pointers = (
+				self.canvas.create_oval(dot, fill='dodger blue'),
+				self.canvas.create_text(
+					self.rrt.goal[0],
+					self.rrt.goal[1] - 14,
+					fill='black',
+					text='Goal'))
+		else:
+			self.canvas.coords(self.goal_pointers[0], dot)
+			self.canvas.coords(self.goal_pointers[1], self.rrt.goal[0], self.rrt.goal[1] - 14)
+
+	# draws the rrt, only touching the nodes and connections which look different from the last frame:
+	# those the planner changed, those which appeared or disappeared since the last frame's time,
+	# and those on the path when the finish time is reached or left
 	def draw_rrt(self, t):
-		for node, connections in self.rrt.data.items():
-
-			color = 'PaleGreen1' if node.valid else 'salmon'
-
-			# draw the connections too
-			self.draw_connections(t, connections)
-
-			if node and (node.t + node.len) <= t:
-				if not node in self.rrt_node_pointers: # first time
-					self.rrt_node_pointers[node] = self.canvas.create_oval(self.draw_dot((
-						node.loc[0],
-						node.loc[1]),
-						node.size),
-						fill=color)
-					self.rrt_label_pointers[node] = self.canvas.create_text(
-						node.loc[0], 
-						node.loc[1] - 14, 
-						fill='black',
-						text=str(math.ceil((node.t + node.len)*10)/10)) # round to one decimal place
-				else: # all later instances
-					if node in self.visited_nodes:
-						color = 'RoyalBlue1' if self.at_finish_time(t) else color
-					self.canvas.itemconfig(self.rrt_node_pointers[node], fill=color, outline=color)
-					self.canvas.itemconfig(self.rrt_label_pointers[node], fill='black')
-			elif self.rrt_node_pointers.get(node):
-				self.canvas.itemconfig(self.rrt_node_pointers[node], fill='white', outline='white')
-				self.canvas.itemconfig(self.rrt_label_pointers[node], fill='white')
-				self.canvas.tag_lower(self.rrt_label_pointers[node])
-				self.canvas.tag_lower(self.rrt_node_pointers[node])
+		at_finish = self.at_finish_time(t)
+
+		dirty = self.take_changes()
+		for node in dirty:
+			self.sort_arrival(node)
+
+		low, high = sorted((self.drawn_time, t))
+		first = bisect.bisect_right(self.arrival_times, low)
+		last = bisect.bisect_right(self.arrival_times, high)
+		dirty.update(self.arrival_nodes[first:last])
+
+		if at_finish != self.drawn_finish:
+			dirty.update(self.visited_set)
+
+		for node in dirty:
+			self.draw_node(t, node, at_finish)
+
+		self.draw_to_end(at_finish)
+
+		self.drawn_time = t
+		self.drawn_finish = at_finish
+
+	# the nodes which changed since the last frame
+	def take_changes(self):
+		if not self.planner:
+			return self.rrt.take_changes()
+		changes = self.pending
+		self.pending = set()
+		return changes
+
+	# keeps node in the arrival order, moving it if its arrival time changed
+	def sort_arrival(self, node):
+		arrival = node.t + node.len
+		old = self.node_arrivals.get(node)
+		if old == arrival:
+			return
+		if old is not None:
+			i = bisect.bisect_left(self.arrival_times, old)
+			while self.arrival_nodes[i] is not node:
+				i += 1
+			del self.arrival_times[i]
+			del self.arrival_nodes[i]
+
+		i = bisect.bisect_right(self.arrival_times, arrival)
+		self.arrival_times.insert(i, arrival)
+		self.arrival_nodes.insert(i, node)
+		self.node_arrivals[node] = arrival
+
+	# draws a node, and the connection leading to it, as they should look at time t
+	def draw_node(self, t, node, at_finish):
+		visible = (node.t + node.len) <= t
+		color = 'PaleGreen1' if node.valid else 'salmon'
+		if visible and at_finish and node in self.visited_set:
+			color = 'RoyalBlue1'
+
+		# RRT* can move a node onto a new trunk, changing its connection and arrival time
+		state = (visible, color, node.parent and node.parent.start, node.len)
+		if self.node_states.get(node) == state:
+			return
+		self.node_states[node] = state
+
+		if visible:
+			if not node in self.rrt_node_pointers: # first time
+				self.rrt_node_pointers[node] = self.canvas.create_oval(self.draw_dot((
+					node.loc[0],
+					node.loc[1]),
+					node.size),
+					fill=color)
+				self.rrt_label_pointers[node] = self.canvas.create_text(
+					node.loc[0], 
+					node.loc[1] - 14, 
+					fill='black',
+					text=str(math.ceil((node.t + node.len)*10)/10)) # round to one decimal place
+			else: # all later instances
+				self.canvas.itemconfig(self.rrt_node_pointers[node], fill=color, outline=color)
+				self.canvas.itemconfig(self.rrt_label_pointers[node], fill='black',
+					text=str(math.ceil((node.t + node.len)*10)/10))
+		elif self.rrt_node_pointers.get(node):
+			self.canvas.itemconfig(self.rrt_node_pointers[node], fill='white', outline='white')
+			self.canvas.itemconfig(self.rrt_label_pointers[node], fill='white')
+			self.canvas.tag_lower(self.rrt_label_pointers[node])
+			self.canvas.tag_lower(self.rrt_node_pointers[node])
+
+		if node.parent:
+			self.draw_connection(node.parent, visible, color)
+
+	# removes everything drawn for a node which the planner pruned
+	def forget_node(self, node):
+		for pointers in (self.rrt_node_pointers, self.rrt_label_pointers, self.rrt_connection_pointers):
+			pointer = pointers.pop(node, None)
+			if pointer:
+				self.canvas.delete(pointer)
+		self.node_states.pop(node, None)
+		self.connection_starts.pop(node, None)
+
+		i = bisect.bisect_left(self.arrival_times, self.node_arrivals.pop(node))
+		while self.arrival_nodes[i] is not node:
+			i += 1
+		del self.arrival_times[i]
+		del self.arrival_nodes[i]
+
+	# draws the connection leading to a node the same way as the node
+	def draw_connection(self, connection, visible, color):
+		node = connection.start
+		# connections are keyed by the node they lead to
+		connect_pointer = self.rrt_connection_pointers.get(connection.end)
+
+		if visible:
+			if not connect_pointer:
+				# get the actual node, not the name of it
+				other_node = connection.end
+
+				connect_pointer = self.canvas.create_line(
+					node.loc[0],
+					node.loc[1],
+					other_node.loc[0],
+					other_node.loc[1],
+					fill=color,
+					width=4)
+				self.rrt_connection_pointers[connection.end] = connect_pointer
+				self.connection_starts[connection.end] = node
+				self.canvas.tag_lower(connect_pointer)
+				return
+			self.canvas.itemconfig(connect_pointer, fill=color)
+
+		elif connect_pointer:
+			self.canvas.itemconfig(connect_pointer, fill='white')
+			self.canvas.tag_lower(connect_pointer)
+
+		# RRT* moved the node onto a new trunk since the line was drawn
+		if connect_pointer and self.connection_starts.get(connection.end) is not node:
+			self.canvas.coords(connect_pointer, node.loc[0], node.loc[1], connection.end.loc[0], connection.end.loc[1])
+			self.connection_starts[connection.end] = node
 
 	# returns True if t is equal to self.finish_time 
 	# (ie: the moment when the path to the goal exists)
 	def at_finish_time(self, t):
 		return abs(t - self.finish_time) < .1
 
-	def draw_connections(self, t, connections):
-		for connection in connections:
-				
-			color = ('PaleGreen1' if connection.valid else 'salmon')
-
-			# description of the connection
-			node = connection.start
-			connect_name = self.rrt.connect_name(connection.start, connection.end)
-			connect_pointer = self.rrt_connection_pointers.get(connect_name)
-
-			if connection and node and (connection.t + connection.len) <= t:
-				if not connect_pointer:
-					# get the actual node, not the name of it
-					other_node = connection.end
-
-					connect_pointer = self.canvas.create_line(
-						node.loc[0],
-						node.loc[1],
-						other_node.loc[0],
-						other_node.loc[1],
-						fill=color,
-						width=4)
-					self.rrt_connection_pointers[connect_name] = connect_pointer
-					self.canvas.tag_lower(connect_pointer)
-				else:
-					if connection in self.visited:
-						color = 'RoyalBlue1' if self.at_finish_time(t) else color
-					self.canvas.itemconfig(connect_pointer, fill=color)
-
-			elif self.rrt_connection_pointers.get(connect_name):
-				self.canvas.itemconfig(connect_pointer, fill='white')
-				self.canvas.tag_lower(connect_pointer)
+	# draws the last leg, from the end of the path to the goal, only at the finish time
+	def draw_to_end(self, at_finish):
+		if at_finish == self.drawn_finish and (self.to_end or not at_finish):
+			return
 
-		if self.at_finish_time(t):
+		if at_finish:
 			if self.to_end:
 				self.canvas.itemconfig(self.to_end, fill='RoyalBlue1')
 				self.canvas.tag_raise(self.to_end)
@@ -215,14 +401,8 @@ class Simulator(object):
 	# loops over the obstacles and draws them in turn at time = t
 	def draw_obstacles(self, t):
 		for obstacle in self.obstacles:
-			a = obstacle.velocity[2]
-			absolute_obs = obstacle.absolute_pos(t)
-			absolute_points = []
-
-			for abs_point in absolute_obs.points:
-				# we need to loop over this since we have vectors, not a list of points
-				absolute_points.append(abs_point[0])
-				absolute_points.append(abs_point[1])
+			# the planner has usually already placed the obstacle at this time
+			absolute_points = self.pose_cache.vertices(obstacle, t).ravel().tolist()
 
 			if not obstacle.t0 in self.obstacle_pointers:
 				obstacle_pointer = self.canvas.create_polygon(absolute_points, fill='light blue')
@@ -234,15 +414,14 @@ class Simulator(object):
 				obstacle_pointer = self.obstacle_pointers.get(obstacle.t0)
 				self.canvas.coords(obstacle_pointer, tuple(absolute_points))
 
+			# draw a dot at the centroid of the shape
+			# need to add to the t0 point to get the absolute location
+			absolute_centroid = self.draw_dot(obstacle.centroid(t).add(obstacle.t0), 3)
 			if not obstacle.t0 in self.centroid_pointers:
-				# draw a dot at the centroid of the shape
-				# need to add to the t0 point to get the absolute location
-				absolute_centroid = self.draw_dot(obstacle.centroid(t).add(obstacle.t0), 3)
 				self.centroid_pointers[obstacle.t0] = self.canvas.create_oval(absolute_centroid, 
 					fill="steel blue", outline="")
 			else:
 				centroid_pointer = self.centroid_pointers.get(obstacle.t0)
-				absolute_centroid = self.draw_dot(obstacle.centroid(t).add(obstacle.t0), 3)
 				self.canvas.coords(centroid_pointer, absolute_centroid)
 
 	# there is no built-in method for drawing a dot, so this implements one
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# the validity of every node of a tree at one time, one bit per node
+# bit i of valid is whether nodes[i] is valid, and of blocked whether the connection leading to it crosses
+# an obstacle; nodes added after the snapshot was taken aren't covered
+class ValiditySnapshot(object):
+	__slots__ = ("count", "valid", "blocked")
+
+	def __init__(self, valid, blocked):
+		self.count = len(valid)
+		self.valid = np.packbits(valid)
+		self.blocked = np.packbits(blocked)
+
+	@property
+	def nbytes(self):
+		return self.valid.nbytes + self.blocked.nbytes
+
+	# the indices of the nodes covered by both snapshots whose bits differ between them
+	def differences(self, other):
+		count = min(self.count, other.count)
+		size = (count + 7) // 8
+		differ = (self.valid[:size] ^ other.valid[:size]) | (self.blocked[:size] ^ other.blocked[:size])
+		return np.flatnonzero(np.unpackbits(differ, count=count))
+
+	# the valid and blocked bits of node i
+	def bits(self, i):
+		byte, bit = divmod(i, 8)
+		mask = 0x80 >> bit
+		return bool(self.valid[byte] & mask), bool(self.blocked[byte] & mask)
+
+# remembers the validity of a tree at the times it has been checked at, so going back to one of them
+# restores the bits which differ rather than checking every connection again
+# the least recently used snapshots are dropped once they take up more than max_bytes
+class ValiditySnapshots(object):
+
+	def __init__(self, max_bytes=16 * 1024 * 1024):
+		self.max_bytes = max_bytes
+		self.snapshots = OrderedDict()
+		self.nbytes = 0
+
+		self.hits = 0
+		self.misses = 0
+
+	def __str__(self):
+		return ("ValiditySnapshots: [" + str(len(self.snapshots)) + " times, " + str(self.nbytes) + "/" +
+			str(self.max_bytes) + " bytes hits: " + str(self.hits) + " misses: " + str(self.misses) + "]")
+
+	def __len__(self):
+		return len(self.snapshots)
+
+	# the snapshot taken at time t, or None
+	def get(self, t):
+		snapshot = self.snapshots.get(t)
+		if snapshot is None:
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		self.snapshots.move_to_end(t)
+		return snapshot
+
+	# the snapshot taken at time t, or None, without counting it as used
+	def peek(self, t):
+		return self.snapshots.get(t)
+
+	# keeps the valid and blocked flags, boolean arrays with one entry per node, as the snapshot at time t
+	def put(self, t, valid, blocked):
+		old = self.snapshots.pop(t, None)
+		if old is not None:
+			self.nbytes -= old.nbytes
+
+		snapshot = ValiditySnapshot(valid, blocked)
+		self.snapshots[t] = snapshot
+		self.nbytes += snapshot.nbytes
+		while self.nbytes > self.max_bytes and len(self.snapshots) > 1:
+			t, old = self.snapshots.popitem(last=False)
+			self.nbytes -= old.nbytes
+		return snapshot
+
+	# forgets every snapshot, needed whenever the tree changes other than by adding nodes
+	def clear(self):
+		self.snapshots.clear()
+		self.nbytes = 0
+
+	def stats(self):
+		return {"times": len(self.snapshots), "bytes": self.nbytes, "max_bytes": self.max_bytes,
+			"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,179 @@
+import heapq
+import math
+
+# a uniform grid over the plane for finding items near a point without checking all of them
+# the cells shrink as more items are added, so each cell stays small however large the tree grows
+class GridIndex(object):
+
+	# the average number of items per occupied cell before the cells are split
+	max_per_cell = 16
+
+	# cells are never split smaller than this, however many items share a point
+	min_cell_size = 1e-3
+
+	def __init__(self, cell_size=50.0):
+		self.cell_size = float(cell_size)
+		self.cells = {} # (column, row) -> list of (x, y, item)
+		self.count = 0
+		self.bounds = None # [min column, min row, max column, max row] of every cell ever filled
+		self.next_split = 0 # no split is tried before there are this many items, see split
+
+	def __len__(self):
+		return self.count
+
+	def __str__(self):
+		return ("GridIndex: [" + str(self.count) + " items in " + str(len(self.cells)) +
+			" cells of " + str(self.cell_size) + "]")
+
+	# the cell containing x, y
+	def cell(self, x, y):
+		return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+	def add(self, item, x, y):
+		key = self.cell(x, y)
+		self.cells.setdefault(key, []).append((x, y, item))
+		self.grow_bounds(key)
+		self.count += 1
+
+		if self.count > self.max_per_cell * len(self.cells) and self.count >= self.next_split:
+			self.split()
+
+	# removes an item which was added at x, y
+	def remove(self, item, x, y):
+		key = self.cell(x, y)
+		entries = self.cells[key]
+		for i in range(0, len(entries)):
+			if entries[i][2] is item:
+				del entries[i]
+				break
+		else:
+			raise KeyError(item)
+
+		if not entries:
+			del self.cells[key]
+		self.count -= 1
+
+	# halves the cell size and sorts every item into the new cells
+	# the cells keep halving until the items are spread over more of them; if they never are (as when
+	# many share a point) before reaching min_cell_size the cells are kept as they were, and splitting
+	# isn't tried again until the number of items has doubled
+	def split(self):
+		cell_size = self.cell_size
+		cells = self.cells
+		while len(cells) <= len(self.cells):
+			cell_size /= 2.0
+			if cell_size < self.min_cell_size:
+				self.next_split = 2 * self.count
+				return
+
+			cells = {}
+			for cell in self.cells.values():
+				for entry in cell:
+					key = (int(math.floor(entry[0] / cell_size)), int(math.floor(entry[1] / cell_size)))
+					cells.setdefault(key, []).append(entry)
+
+		self.cell_size = cell_size
+		self.cells = cells
+		self.bounds = None
+		for key in cells:
+			self.grow_bounds(key)
+
+	def grow_bounds(self, key):
+		if self.bounds is None:
+			self.bounds = [key[0], key[1], key[0], key[1]]
+		else:
+			bounds = self.bounds
+			bounds[0] = min(bounds[0], key[0])
+			bounds[1] = min(bounds[1], key[1])
+			bounds[2] = max(bounds[2], key[0])
+			bounds[3] = max(bounds[3], key[1])
+
+	# returns every item within r of x, y
+	def within(self, x, y, r):
+		low = self.cell(x - r, y - r)
+		high = self.cell(x + r, y + r)
+		r_squared = r * r
+		found = []
+
+		for column in range(low[0], high[0] + 1):
+			for row in range(low[1], high[1] + 1):
+				for item_x, item_y, item in self.cells.get((column, row), ()):
+					if (item_x - x)**2 + (item_y - y)**2 <= r_squared:
+						found.append(item)
+		return found
+
+	# returns the k items nearest to x, y, nearest first, or none if k isn't positive
+	# searches rings of cells outwards, starting from the first ring to reach an occupied cell, until no
+	# unsearched cell can hold anything closer; once that has looked at more cells than are occupied,
+	# every occupied cell is simply checked instead
+	def nearest(self, x, y, k=1):
+		if not self.count or k <= 0:
+			return []
+
+		k = min(k, self.count)
+		center = self.cell(x, y)
+		bounds = self.bounds
+		# no occupied cell lies nearer than the first ring or further out than the last
+		first_ring = max(0, bounds[0] - center[0], center[0] - bounds[2], bounds[1] - center[1], center[1] - bounds[3])
+		last_ring = max(abs(center[0] - bounds[0]), abs(center[1] - bounds[1]),
+			abs(center[0] - bounds[2]), abs(center[1] - bounds[3]))
+
+		best = [] # heap of (-distance squared, tiebreak, item) holding the closest k so far
+		searched = 0
+		ring = first_ring
+		while ring <= last_ring:
+			keys = self.ring(center, ring)
+			searched += len(keys)
+			if searched > len(self.cells):
+				return self.nearest_of(self.cells.keys(), x, y, k)
+			self.add_nearest(best, keys, x, y, k)
+
+			# anything in the next ring is at least this far away
+			reach = ring * self.cell_size
+			if len(best) == k and -best[0][0] <= reach * reach:
+				break
+			ring += 1
+
+		return [entry[2] for entry in sorted(best, reverse=True)]
+
+	# the k items nearest to x, y from the cells with the given keys, nearest first
+	def nearest_of(self, keys, x, y, k):
+		best = []
+		self.add_nearest(best, keys, x, y, k)
+		return [entry[2] for entry in sorted(best, reverse=True)]
+
+	# pushes the items of the cells with the given keys onto best, a heap of the closest k so far
+	def add_nearest(self, best, keys, x, y, k):
+		if k <= 0:
+			return
+		for key in keys:
+			for item_x, item_y, item in self.cells.get(key, ()):
+				entry = (-((item_x - x)**2 + (item_y - y)**2), id(item), item)
+				if len(best) < k:
+					heapq.heappush(best, entry)
+				elif entry > best[0]:
+					heapq.heapreplace(best, entry)
+
+	# the keys of the cells exactly ring cells away from center, leaving out any outside the bounds
+	def ring(self, center, ring):
+		if ring == 0:
+			return [center]
+
+		low_column, low_row, high_column, high_row = self.bounds
+		left = center[0] - ring
+		right = center[0] + ring
+		top = center[1] - ring
+		bottom = center[1] + ring
+
+		keys = []
+		columns = range(max(left, low_column), min(right, high_column) + 1)
+		if low_row <= top <= high_row:
+			keys.extend((column, top) for column in columns)
+		if low_row <= bottom <= high_row:
+			keys.extend((column, bottom) for column in columns)
+		rows = range(max(top + 1, low_row), min(bottom - 1, high_row) + 1)
+		if low_column <= left <= high_column:
+			keys.extend((left, row) for row in rows)
+		if low_column <= right <= high_column:
+			keys.extend((right, row) for row in rows)
+		return keys
@@ -0,0 +1,229 @@
+import numpy as np
+
+from linalgebra import *
+
+# a tree kept in growable NumPy arrays, one entry per node, instead of one object per node and edge
+# each node except the root has exactly one edge leading to it, so the edge's id is its end node's index
+class TreeStore(object):
+
+	# bits of flags
+	VALID = 1
+	BLOCKED = 2
+
+	def __init__(self, capacity=1024):
+		self.count = 0
+		self.x = np.empty(capacity)
+		self.y = np.empty(capacity)
+		self.parent = np.empty(capacity, dtype=np.int32) # -1 for the root
+		self.t = np.empty(capacity) # the time each node was created
+		self.len = np.empty(capacity) # the time taken to travel from the root to each node
+		self.flags = np.empty(capacity, dtype=np.uint8)
+
+		self.children_of = None # built on demand, see children
+
+	def __len__(self):
+		return self.count
+
+	def __str__(self):
+		return "TreeStore: [" + str(self.count) + " nodes, " + str(self.nbytes) + " bytes]"
+
+	# the bytes used by the stored nodes
+	@property
+	def nbytes(self):
+		return self.count * sum(array.itemsize for array in self.arrays())
+
+	def arrays(self):
+		return (self.x, self.y, self.parent, self.t, self.len, self.flags)
+
+	# the time each node is reached
+	@property
+	def arrival(self):
+		return self.t[:self.count] + self.len[:self.count]
+
+	@property
+	def valid(self):
+		return (self.flags[:self.count] & TreeStore.VALID).astype(bool)
+
+	# adds a node and the edge to it from parent, returning the node's index
+	def add(self, x, y, parent=-1, t=0, length=0, valid=True, blocked=False):
+		if self.count == len(self.x):
+			self.reserve(2 * len(self.x))
+
+		i = self.count
+		self.x[i] = x
+		self.y[i] = y
+		self.parent[i] = parent
+		self.t[i] = t
+		self.len[i] = length
+		self.flags[i] = (TreeStore.VALID if valid else 0) | (TreeStore.BLOCKED if blocked else 0)
+		self.count += 1
+		self.children_of = None
+		return i
+
+	# makes room for at least capacity nodes
+	def reserve(self, capacity):
+		if capacity <= len(self.x):
+			return
+		for name in ("x", "y", "parent", "t", "len", "flags"):
+			old = getattr(self, name)
+			new = np.empty(capacity, dtype=old.dtype)
+			new[:self.count] = old[:self.count]
+			setattr(self, name, new)
+
+	def set_flag(self, i, flag, value):
+		if value:
+			self.flags[i] |= flag
+		else:
+			self.flags[i] &= ~np.uint8(flag)
+
+	# the indices of the nodes whose parent is i
+	def children(self, i):
+		if self.children_of is None:
+			parents = self.parent[1:self.count] if self.count else self.parent[:0]
+			order = np.argsort(parents, kind="stable") + 1
+			bounds = np.searchsorted(parents[order - 1], np.arange(self.count + 1))
+			self.children_of = (order, bounds)
+		order, bounds = self.children_of
+		return order[bounds[i]:bounds[i + 1]]
+
+	# the indices from the root to node i
+	def path(self, i):
+		indices = []
+		while i >= 0:
+			indices.append(i)
+			i = self.parent[i]
+		indices.reverse()
+		return indices
+
+	def node(self, i):
+		return NodeView(self, i)
+
+	# the edge leading to node i
+	def edge(self, i):
+		return EdgeView(self, i)
+
+	# copies the nodes and connections of an RRT, returning the store and a map from each node to its index
+	@classmethod
+	def from_rrt(cls, rrt):
+		store = cls(max(1, len(rrt.data)))
+		indices = {}
+		if rrt.first_node is None:
+			return store, indices
+
+		to_visit = [(rrt.first_node, -1)]
+		while to_visit:
+			node, parent = to_visit.pop()
+			connection = node.parent
+			indices[node] = store.add(node.loc[0], node.loc[1], parent, node.t, node.len, node.valid,
+				connection.blocked if connection else False)
+			for connection in rrt.data[node]:
+				to_visit.append((connection.end, indices[node]))
+		return store, indices
+
+# a node of a TreeStore, with the same attributes as a Node
+class NodeView(object):
+	__slots__ = ("store", "name")
+
+	size = 7
+
+	def __init__(self, store, name):
+		self.store = store
+		self.name = name
+
+	def __eq__(self, other):
+		return isinstance(other, NodeView) and other.store is self.store and other.name == self.name
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash((id(self.store), self.name))
+
+	def __getitem__(self, index):
+		return self.loc[index]
+
+	def __str__(self):
+		return ("[" + str(self.name) + ": " + str(self.valid) + " " + str(self.t + self.len) + " " + str(self.loc) + "]")
+
+	@property
+	def loc(self):
+		return Vector((float(self.store.x[self.name]), float(self.store.y[self.name])))
+
+	@property
+	def t(self):
+		return float(self.store.t[self.name])
+
+	@property
+	def len(self):
+		return float(self.store.len[self.name])
+
+	@property
+	def valid(self):
+		return bool(self.store.flags[self.name] & TreeStore.VALID)
+
+	@valid.setter
+	def valid(self, value):
+		self.store.set_flag(self.name, TreeStore.VALID, value)
+
+	# the edge leading to this node
+	@property
+	def parent(self):
+		return EdgeView(self.store, self.name) if self.store.parent[self.name] >= 0 else None
+
+# an edge of a TreeStore, identified by the index of the node it leads to, with the same attributes as a Connection
+class EdgeView(object):
+	__slots__ = ("store", "name")
+
+	def __init__(self, store, name):
+		self.store = store
+		self.name = name
+
+	def __eq__(self, other):
+		return isinstance(other, EdgeView) and other.store is self.store and other.name == self.name
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash((id(self.store), -1 - self.name))
+
+	def __getitem__(self, index):
+		if index == 0:
+			return self.start
+		elif index == 1:
+			return self.end
+
+	def __str__(self):
+		return ("Connect: [" + str(self.valid) + " (" + str(self.start) + " to " + str(self.end) + ") ]")
+
+	@property
+	def start(self):
+		return NodeView(self.store, int(self.store.parent[self.name]))
+
+	@property
+	def end(self):
+		return NodeView(self.store, self.name)
+
+	@property
+	def t(self):
+		return float(self.store.t[self.name])
+
+	@property
+	def len(self):
+		return float(self.store.len[self.name])
+
+	@property
+	def valid(self):
+		return bool(self.store.flags[self.name] & TreeStore.VALID)
+
+	@valid.setter
+	def valid(self, value):
+		self.store.set_flag(self.name, TreeStore.VALID, value)
+
+	@property
+	def blocked(self):
+		return bool(self.store.flags[self.name] & TreeStore.BLOCKED)
+
+	@blocked.setter
+	def blocked(self, value):
+		self.store.set_flag(self.name, TreeStore.BLOCKED, value)